@@ -0,0 +1,120 @@
+'''
+Integration benchmark of the map pipeline.
+
+Creates the map of a synthetic day (hours x stations) with render_map, the
+same path of call_spiderwebs: the icons are rendered with render_icons
+(render_batch with --savepngs) and composed and encoded by draw_map, on
+synthetic base maps with the stations projected from their coordinates.
+
+The work of the day is measured first, in this process and without
+workers: the icons of one hour are rendered and one frame is composed and
+encoded. The whole day must take at most --slack times that work for every
+hour, plus --overhead seconds for the pool and the I/O, so any fixed wait
+(per image, per frame or before compositing) makes it fail.
+
+Usage: python benchmarks/bench_pipeline.py [--hours 6] [--stations 7] [--workers 1] [--savepngs]
+'''
+
+import argparse
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'map'))
+import visualization_spiderwebs as vs
+import create_map
+from mymap import hour_jobs, render_map
+
+
+def synthetic_day(hours, stations, rng):
+    '''
+    Return the cube (hours x stations x pollutants), the name of the stations and their coordinates.
+    '''
+    cube = rng.uniform(0, 100, (hours, stations, 4))
+    titles = ['station' + str(s+1) for s in range(stations)]
+    # Stations around the center of the map
+    angles = np.linspace(0, 2*np.pi, stations, endpoint=False)
+    coords = pd.DataFrame({
+        'station': titles,
+        'lon': create_map.MAP_CENTER['lon'] + 0.3*np.cos(angles),
+        'lat': create_map.MAP_CENTER['lat'] + 0.3*np.sin(angles),
+    })
+    return cube, titles, coords
+
+
+def save_basemaps():
+    '''Save a background and a localizator of the size of the images of plot_map.'''
+    background = np.full((500, 700, 3), 230, dtype=np.uint8)
+    background[::20] = 180
+    background[:, ::20] = 180
+    Image.fromarray(background).save('map.png')
+    Image.fromarray(background).save('map_x.png')
+
+
+def hour_work(jobs, coords, savepngs, repeat=3):
+    '''
+    Return the seconds of the work of one hour in this process: render its
+    icons (or images) and compose and encode its frame. The median of
+    `repeat` runs, after one run that creates the figure and loads the
+    background, which the day reuses.
+    '''
+    base, positions = create_map.map_layout('map_x.png', 'map.png', coords, project=True)
+    times = []
+    with create_map.GifWriter('hour.gif', create_map.FRAME_SIZE, 1, True) as writer:
+        for _ in range(repeat + 1):
+            start = time.perf_counter()
+            if savepngs:
+                icons = create_map.load_icons(vs.render_batch(jobs, 1))
+            else:
+                icons = vs.render_icons(jobs, 1, size=create_map.ICON_SIZE)
+            writer.append_data(create_map.compose_frame(base, icons, positions))
+            times.append(time.perf_counter() - start)
+    return statistics.median(times[1:])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--hours', type=int, default=6)
+    parser.add_argument('--stations', type=int, default=7)
+    parser.add_argument('--workers', type=int, default=1)
+    parser.add_argument('--savepngs', action='store_true', help='save the spiderwebs as PNG images (render_batch)')
+    parser.add_argument('--slack', type=float, default=1.5, help='the times the measured work that the day can take')
+    parser.add_argument('--overhead', type=float, default=1.0, help='the seconds of the pool and the I/O allowed over the work')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    cube, titles, coords = synthetic_day(args.hours, args.stations, rng)
+    jobs = []
+    for h in range(args.hours):
+        jobs.extend(hour_jobs(cube[h], h, titles))
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)
+        try:
+            save_basemaps()
+            work = hour_work(jobs[:args.stations], coords, args.savepngs) * args.hours
+            start = time.perf_counter()
+            nframes = render_map(jobs, coords, 'bench', args.workers, savepngs=args.savepngs, project=True)
+            elapsed = time.perf_counter() - start
+            frames = Image.open('bench.gif').n_frames
+        finally:
+            os.chdir(cwd)
+
+    bound = args.slack*work + args.overhead
+    print('spiderwebs: %d, frames: %d' % (len(jobs), nframes))
+    print('measured work: %.2f s (%.1f ms per frame)' % (work, 1000*work/args.hours))
+    print('wall time: %.2f s (bound %.2f s)' % (elapsed, bound))
+    if nframes != args.hours or frames != args.hours:
+        sys.exit('The map has %d frames (%d in the GIF), expected %d' % (nframes, frames, args.hours))
+    if elapsed > bound:
+        sys.exit('The map took %.2f s more than the work measured' % (elapsed - args.slack*work))
+
+
+if __name__ == '__main__':
+    main()
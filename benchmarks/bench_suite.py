@@ -0,0 +1,374 @@
+'''
+Benchmark suite of the hot paths of the spiderwebs.
+
+Every case runs with synthetic data of the size selected (spokes, stations,
+hours) in a temporary folder:
+
+- radar_factory: the cached projection of the spiderwebs.
+- normalize: normalize_datasets of all the spiderwebs of the day at once.
+- root_create_spiderwebs: the figure with all the stations (PDF), and in memory (RGBA).
+- map_create_spiderwebs: one PNG for each station and hour.
+- map_render_icons: the icons of the map rendered in memory.
+- animations_gif, animations_mp4: the animation of the spiderwebs.
+- draw_map: the composition and encoding of the GIF of the map.
+- encode_gif, encode_gif_optimized, encode_mp4: only the encoding of the frames of the map
+  (encode_gif with a palette for each frame, encode_gif_optimized with a global palette and the changes).
+
+Each case reports the median time of --repeat runs (each run calls the
+case until --min-seconds are measured), the items (charts or frames) per
+second, the bytes written and the peak of the Python allocations
+(tracemalloc) of one more run.
+
+The results can be saved as a baseline (--save-baseline) and are compared
+with it in later runs: a case whose rate drops, or whose bytes or memory
+grow, more than --tolerance is a regression and the exit status is 1. The
+rates are only compared with a baseline of the same host.
+
+Usage: python benchmarks/bench_suite.py [--spokes 4] [--stations 7] [--hours 6] [--cases draw_map ...]
+'''
+
+import argparse
+import importlib.util
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import matplotlib
+matplotlib.use('Agg')
+import matplotlib.pyplot as plt
+from PIL import Image
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+
+sys.path.insert(0, os.path.join(ROOT, 'map'))
+import visualization_spiderwebs as map_vs
+import create_map
+
+
+def load_module(name, path):
+    '''
+    Import one of the visualization_spiderwebs modules (the outputs of the spiderwebs package) with another name.
+    '''
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    sys.modules[name] = module
+    spec.loader.exec_module(module)
+    return module
+
+
+root_vs = load_module('root_spiderwebs', os.path.join(ROOT, 'visualization_spiderwebs.py'))
+animations_vs = load_module('animations_spiderwebs', os.path.join(ROOT, 'animations', 'visualization_spiderwebs.py'))
+
+
+class Data:
+
+    '''
+
+    Synthetic day with `hours` spiderwebs of `stations` stations and `spokes` lines.
+
+    '''
+
+    def __init__(self, spokes, stations, hours, seed=0):
+        rng = np.random.default_rng(seed)
+        self.spokes, self.stations, self.hours = spokes, stations, hours
+        # One dataset (spokes x stations) for each hour
+        self.cube = rng.uniform(0, 100, (hours, spokes, stations))
+        self.spoke_labels = ['S' + str(s+1) for s in range(spokes)]
+        self.titles = ['station' + str(s+1) for s in range(stations)]
+        colors = ['b', 'r', 'g', 'm', 'y']
+        self.colors = [colors[s % len(colors)] for s in range(stations)]
+        # Stations around the center of the map
+        angles = np.linspace(0, 2*np.pi, stations, endpoint=False)
+        self.coords = pd.DataFrame({
+            'station': self.titles,
+            'lon': create_map.MAP_CENTER['lon'] + 0.3*np.cos(angles),
+            'lat': create_map.MAP_CENTER['lat'] + 0.3*np.sin(angles),
+        })
+
+    def jobs(self):
+        '''Return the jobs of map/visualization_spiderwebs of the whole day.'''
+        jobs = []
+        for h in range(self.hours):
+            title = 'hour' + str(h+1) + '_'
+            jobs.extend(map_vs.spiderweb_jobs(self.cube[h], 4, title, self.titles, self.spoke_labels, self.colors, 'polygon'))
+        return jobs
+
+    def animation(self):
+        '''Return the datasets, titles and colors of an animation with one frame for each chart (50 at most).'''
+        datasets = self.cube.transpose(1, 0, 2).reshape(self.spokes, -1)[:, :50]
+        n = datasets.shape[1]
+        titles = [self.titles[i % self.stations] for i in range(n)]
+        colors = [self.colors[i % self.stations] for i in range(n)]
+        return datasets, titles, colors
+
+    def images(self):
+        '''Save a background and a localizator of the size of the images of plot_map.'''
+        background = np.full((500, 700, 3), 230, dtype=np.uint8)
+        background[::20] = 180
+        background[:, ::20] = 180
+        Image.fromarray(background).save('map.png')
+        Image.fromarray(background).save('map_x.png')
+        return 'map_x.png', 'map.png'
+
+
+def check_gif_screen(path, size):
+    '''Fail if the logical screen of the GIF (bytes 6 to 10 of the header) is not the size of its frames.'''
+    with open(path, 'rb') as file:
+        header = file.read(10)
+    screen = (int.from_bytes(header[6:8], 'little'), int.from_bytes(header[8:10], 'little'))
+    if screen != tuple(size):
+        raise AssertionError('%s has a logical screen of %s, its frames are %s' % (path, screen, tuple(size)))
+
+
+def folder_bytes(folder='.'):
+    return sum(os.path.getsize(os.path.join(folder, name)) for name in os.listdir(folder))
+
+
+# Cases: each one receives the data and returns (items, bytes written) after working in the current folder
+
+def case_radar_factory(data):
+    calls = 1000
+    for _ in range(calls):
+        root_vs.radar_factory(data.spokes, 'polygon')
+    return calls, 0
+
+
+def case_normalize(data):
+    datasets = data.cube.transpose(1, 0, 2).reshape(data.spokes, -1)
+    for _ in range(100):
+        map_vs.normalize_datasets(datasets, 4)
+    return 100*datasets.shape[1], 0
+
+
+def case_root_create_spiderwebs(data):
+    root_vs.create_spiderwebs(data.cube[0], 4, data.stations, 'bench', data.titles, data.spoke_labels, data.colors, 'polygon')
+    plt.close('all')
+    return data.stations, folder_bytes()
+
+
+def case_root_create_spiderwebs_rgba(data):
+    root_vs.create_spiderwebs(data.cube[0], 4, data.stations, 'bench', data.titles, data.spoke_labels, data.colors, 'polygon',
+                              'rgba', show=False)
+    return data.stations, 0
+
+
+def case_map_create_spiderwebs(data):
+    names = map_vs.create_spiderwebs(data.cube.transpose(1, 0, 2).reshape(data.spokes, -1), 4, data.stations*data.hours, 'chart_',
+                                     data.titles*data.hours, data.spoke_labels, data.colors*data.hours, 'polygon')
+    return len(names), folder_bytes()
+
+
+def case_map_render_icons(data):
+    atlas = map_vs.render_icons(data.jobs(), size=create_map.ICON_SIZE)
+    return len(atlas), 0
+
+
+def _animation(data, outputtype):
+    datasets, titles, colors = data.animation()
+    animations_vs.create_spiderwebs(datasets, 4, len(titles), 'bench', titles, data.spoke_labels, colors, 'polygon', outputtype)
+    if outputtype == 'gif':
+        # The first frame covers the whole animation
+        check_gif_screen('bench.gif', Image.open('bench.gif').tile[0][1][2:])
+    return len(titles), folder_bytes()
+
+
+def case_animations_gif(data):
+    return _animation(data, 'gif')
+
+
+def case_animations_mp4(data):
+    return _animation(data, 'video')
+
+
+def case_draw_map(data):
+    localizator, background = data.images()
+    atlas = map_vs.render_icons(data.jobs(), size=create_map.ICON_SIZE)
+    start = time.perf_counter()
+    nframes = create_map.draw_map(localizator, background, atlas, 'bench', coords=data.coords, project=True)
+    # Only the map is measured, not the icons
+    data.offset = time.perf_counter() - start
+    check_gif_screen('bench.gif', create_map.FRAME_SIZE)
+    return nframes, os.path.getsize('bench.gif')
+
+
+def _map_frames(data):
+    localizator, background = data.images()
+    atlas = map_vs.render_icons(data.jobs(), size=create_map.ICON_SIZE)
+    return list(create_map.map_frames(localizator, background, atlas, coords=data.coords, project=True))
+
+
+def _encode_gif(data, optimize):
+    frames = _map_frames(data)
+    start = time.perf_counter()
+    with create_map.GifWriter('bench.gif', create_map.FRAME_SIZE, 1, optimize) as writer:
+        for frame in frames:
+            writer.append_data(frame)
+    data.offset = time.perf_counter() - start
+    check_gif_screen('bench.gif', create_map.FRAME_SIZE)
+    return len(frames), os.path.getsize('bench.gif')
+
+
+def case_encode_gif(data):
+    return _encode_gif(data, False)
+
+
+def case_encode_gif_optimized(data):
+    return _encode_gif(data, True)
+
+
+def case_encode_mp4(data):
+    frames = _map_frames(data)
+    start = time.perf_counter()
+    with animations_vs.VideoWriter('bench.mp4') as writer:
+        for frame in frames:
+            writer.append_data(np.dstack((frame, np.full(frame.shape[:2], 255, dtype=np.uint8))))
+    data.offset = time.perf_counter() - start
+    return len(frames), os.path.getsize('bench.mp4')
+
+
+CASES = {name[len('case_'):]: case for name, case in globals().items() if name.startswith('case_')}
+
+
+# Seconds measured at least in each run: the fast cases are called again in the same run until they reach it
+MIN_SECONDS = 0.2
+
+
+def run_case(case, data, repeat, minseconds=MIN_SECONDS):
+
+    '''
+
+    Run a case `repeat` times and once more with tracemalloc, each time in a new temporary folder.
+
+    In each run the case is called again until `minseconds` are measured, so
+    the fast cases are not timed over a few milliseconds. The time of the
+    case is the median of the runs, which a single slow or fast run doesn't move.
+
+    The cases that prepare their input set data.offset to the seconds of
+    the part measured, otherwise the whole case is measured.
+
+    '''
+
+    cwd = os.getcwd()
+    times = []
+    for run in range(repeat + 1):
+        with tempfile.TemporaryDirectory() as tmp:
+            os.chdir(tmp)
+            try:
+                if run == repeat:
+                    tracemalloc.start()
+                elapsed, calls = 0.0, 0
+                # Only one call with tracemalloc, which slows down the allocations
+                while calls == 0 or (run < repeat and elapsed < minseconds):
+                    data.offset = None
+                    start = time.perf_counter()
+                    items, nbytes = case(data)
+                    elapsed += time.perf_counter() - start if data.offset is None else data.offset
+                    calls += 1
+                if run == repeat:
+                    peak = tracemalloc.get_traced_memory()[1]
+                    tracemalloc.stop()
+            finally:
+                os.chdir(cwd)
+        if run < repeat:
+            times.append(elapsed / calls)
+    seconds = statistics.median(times)
+    return {
+        'seconds': round(seconds, 6),
+        'items': items,
+        'items_per_sec': round(items / seconds, 3) if seconds > 0 else None,
+        'bytes': nbytes,
+        'bytes_per_sec': round(nbytes / seconds, 1) if seconds > 0 else None,
+        'peak_mb': round(peak / 2**20, 3),
+    }
+
+
+def compare(results, baseline, tolerance, rates=True):
+
+    '''
+
+    Return the regressions of the results against the baseline.
+
+    The rates are only compared if `rates` is True (the same host), the
+    bytes written and the memory always.
+
+    '''
+
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if rates and base['items_per_sec'] and result['items_per_sec'] < base['items_per_sec']*(1 - tolerance):
+            regressions.append('%s: %.1f items/s, baseline %.1f' % (name, result['items_per_sec'], base['items_per_sec']))
+        if result['bytes'] > base['bytes']*(1 + tolerance):
+            regressions.append('%s: %d bytes, baseline %d' % (name, result['bytes'], base['bytes']))
+        # 1 MB of slack for the small cases
+        if result['peak_mb'] > base['peak_mb']*(1 + tolerance) + 1:
+            regressions.append('%s: %.1f MB, baseline %.1f' % (name, result['peak_mb'], base['peak_mb']))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--spokes', type=int, default=4)
+    parser.add_argument('--stations', type=int, default=7)
+    parser.add_argument('--hours', type=int, default=6)
+    parser.add_argument('--repeat', type=int, default=5, help='the number of runs of each case, the median is reported')
+    parser.add_argument('--min-seconds', type=float, default=MIN_SECONDS, help='the seconds measured at least in each run')
+    parser.add_argument('--cases', nargs='+', choices=list(CASES), default=list(CASES))
+    parser.add_argument('--baseline', default=BASELINE, help='the JSON file with the baseline results')
+    parser.add_argument('--save-baseline', action='store_true', help='save the results as the new baseline')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='the change allowed against the baseline (0.25 is 25%%)')
+    parser.add_argument('--output', help='save the results as JSON')
+    args = parser.parse_args()
+
+    data = Data(args.spokes, args.stations, args.hours)
+    config = {'spokes': args.spokes, 'stations': args.stations, 'hours': args.hours}
+    results = {}
+    for name in args.cases:
+        results[name] = run_case(CASES[name], data, args.repeat, args.min_seconds)
+        result = results[name]
+        print('%-28s %9.3f s %10.1f items/s %10d bytes %8.1f MB' % (name, result['seconds'], result['items_per_sec'] or 0, result['bytes'], result['peak_mb']))
+
+    report = {
+        'config': config,
+        'host': {'node': platform.node(), 'machine': platform.machine(), 'cpus': os.cpu_count(), 'python': platform.python_version()},
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w') as file:
+            json.dump(report, file, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, 'w') as file:
+            json.dump(report, file, indent=2)
+        print('Baseline saved in ' + args.baseline)
+        return
+
+    try:
+        with open(args.baseline, 'r') as file:
+            baseline = json.load(file)
+    except OSError:
+        print('No baseline to compare (use --save-baseline)')
+        return
+    if baseline['config'] != config:
+        print('The baseline was measured with %s, the comparison is skipped' % baseline['config'])
+        return
+    samehost = baseline['host'] == report['host']
+    if not samehost:
+        print('The baseline was measured in another host, only the bytes and the memory are compared: %s' % baseline['host'])
+    regressions = compare(results, baseline['results'], args.tolerance, samehost)
+    if regressions:
+        sys.exit('Regressions against the baseline:\n' + '\n'.join(regressions))
+    print('No regressions against the baseline')
+
+
+if __name__ == '__main__':
+    main()
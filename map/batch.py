@@ -0,0 +1,211 @@
+'''
+Create the maps of every day of a range of dates.
+'''
+
+import gc
+import json
+import os
+import warnings
+import pandas as pd
+import create_map
+import visualization_spiderwebs as vs
+from cache import CACHE_DIR, digest, file_key
+from measurements import POLLUTANTS, MeasurementIndex, load_measurements
+from profiling import peak_rss, stage
+from mymap import day_jobs, day_scales, plot_map, render_map
+
+
+# File with the days already finished by run_range
+BATCH_STATE = os.path.join(CACHE_DIR, 'batch.json')
+
+
+def day_names(start: str, end: str) -> list:
+
+    '''
+
+    Return the name of each day from `start` to `end` (included) in the format of filled.csv (2-Dec-17).
+
+    '''
+
+    dates = pd.date_range(pd.to_datetime(start, format='%d-%b-%y'), pd.to_datetime(end, format='%d-%b-%y'), freq='D')
+    return [str(date.day) + date.strftime('-%b-%y') for date in dates]
+
+
+def current_rss() -> int:
+
+    '''
+
+    Return the memory (resident set size) of this process in bytes.
+
+    Uses /proc/self/statm on Linux and the peak of the process in other systems (see peak_rss).
+
+    '''
+
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            pages = int(file.read().split()[1])
+        return pages * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        peak = peak_rss()
+        return peak['self'] if peak else 0
+
+
+def workers_within(ceiling: int, workers: int) -> int:
+
+    '''
+
+    Return the number of workers (up to `workers`) that keep this process and
+    the pool of the next day under `ceiling` bytes.
+
+    Each worker is counted with the larger of the peak of the workers of the
+    last days and the memory of this process, because a worker starts as a
+    copy of it. The caches are released when the pool doesn't fit. With
+    one worker the spiderwebs are rendered in this process.
+
+    Raises MemoryError if this process alone is above the ceiling.
+
+    '''
+
+    rss = current_rss()
+    # The peak of the largest child finished, 0 if the system doesn't report it
+    peak = peak_rss()
+    worker = max(peak['children'] if peak else 0, rss)
+    if rss + (worker*workers if workers > 1 else 0) > ceiling:
+        release_memory()
+        rss = current_rss()
+    if rss > ceiling:
+        raise MemoryError('The memory of the process (%d MB) is above the ceiling (%d MB).' % (rss // 2**20, ceiling // 2**20))
+    if workers <= 1:
+        return workers
+    return int(max(1, min(workers, (ceiling - rss) // worker)))
+
+
+def release_memory() -> None:
+    '''
+    Close the figures and the backgrounds cached by the last day.
+    '''
+    vs.release_figures()
+    create_map._backgrounds.clear()
+    gc.collect()
+
+
+def _load_state(path: str, key: str) -> list:
+    '''Return the days finished by the last run with the same key.'''
+    try:
+        with open(path, 'r') as file:
+            state = json.load(file)
+    except (OSError, ValueError):
+        return []
+    if state.get('key') != key:
+        return []
+    return state.get('done', [])
+
+
+def _save_state(path: str, key: str, done: list) -> None:
+    '''Save the days finished. The file is replaced at once, so a crash never leaves it half written.'''
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path + '.tmp', 'w') as file:
+        json.dump({'key': key, 'done': done}, file)
+    os.replace(path + '.tmp', path)
+
+
+def run_range(start: str, end: str, outdir: str = 'maps', method: str = 'minmax', limits: dict = None, workers: int = 1,
+              chunksize: int = None, fill: float = 0, maxmemory: int = None, resume: bool = True, statefile: str = BATCH_STATE,
+              pollutants: list = POLLUTANTS, typeframe: str = 'polygon', savepngs: bool = False,
+              optimize: bool = True) -> list:
+
+    '''
+
+    Create the map of every day from `start` to `end` (included).
+
+    The measurements are memory-mapped (see load_measurements) and the days are
+    processed one at a time: the records of a day are read from the index,
+    normalized, rendered and added to the map, whose frames are written to the
+    GIF as soon as they are composed. So only the spiderwebs of one day are in
+    memory, whatever the length of the range. The scales, the index and the
+    base maps are shared by all the days.
+
+    Parameters
+    ----------
+    start: String
+        The first day (2-Dec-17).
+    end: String
+        The last day.
+    outdir: String
+        The folder where the map of each day is saved (map_2-Dec-17.gif).
+    method: {'minmax', 'zscore', 'robust', 'fixed'}
+        The method of the scales (see call_spiderwebs).
+    limits: dict
+        The limit of each pollutant for the method 'fixed'.
+    workers: int
+        The maximum number of processes rendering the spiderwebs.
+    chunksize: int
+        The number of spiderwebs sent to a process at once.
+    fill: float
+        The value of the stations without records in an hour.
+    maxmemory: int
+        The memory ceiling in megabytes of this process and its workers.
+        Before each day the number of workers is reduced to the ones that
+        fit under it (see workers_within), releasing the caches first if
+        needed. If this process alone is above it, before or after a day, a
+        MemoryError is raised; the days finished are kept for `resume`.
+    resume: bool
+        If True the days finished by the last run of the same range are skipped,
+        so a run stopped by a crash continues from the last day completed.
+    statefile: String
+        The JSON file with the days finished.
+    pollutants: list
+        The pollutants drawn in the spiderwebs.
+    typeframe: {'circle', 'polygon'}
+        The type of the frame of the spiderwebs.
+    savepngs: bool
+        If True the spiderwebs are also saved as PNG images (see call_spiderwebs).
+    optimize: bool
+        If True the GIFs are encoded with a global palette and only the changes (see call_spiderwebs).
+
+    Returns
+    -------
+    list
+        The name of the maps created by this run. The days without hours
+        with records of every pollutant have no map: they are reported with
+        a warning and not recorded as finished.
+
+    '''
+
+    days = day_names(start, end)
+    if not days:
+        raise ValueError('The range from %s to %s has no days: the end is before the start.' % (start, end))
+    os.makedirs(outdir, exist_ok=True)
+    key = digest(days, os.path.abspath(outdir), method, limits, fill, pollutants, typeframe, file_key('filled.csv'), file_key('coords.csv'))
+    done = _load_state(statefile, key) if resume else []
+
+    # Everything shared by the days is prepared once
+    with stage('basemap'):
+        plot_map(days[0])
+    scales = day_scales(method, limits, pollutants)
+    index = MeasurementIndex(load_measurements('filled.csv'))
+    coords = pd.read_csv('coords.csv')
+
+    created = []
+    for day in days:
+        if day in done:
+            continue
+        title = os.path.join(outdir, 'map_' + day)
+        dayworkers = workers
+        if maxmemory is not None:
+            dayworkers = workers_within(maxmemory * 2**20, workers or os.cpu_count() or 1)
+        jobs = day_jobs(index, coords, day, scales, fill, pollutants, typeframe)
+        if not jobs:
+            # Not recorded as finished, so a resumed run tries it again
+            warnings.warn('%s has no hours with records of every pollutant: its map was not created.' % day)
+            continue
+        render_map(jobs, coords, title, dayworkers, chunksize, savepngs, optimize=optimize)
+        del jobs
+        created.append(title + '.gif')
+        done.append(day)
+        _save_state(statefile, key, done)
+        if maxmemory is not None and current_rss() > maxmemory * 2**20:
+            release_memory()
+            if current_rss() > maxmemory * 2**20:
+                raise MemoryError('The memory of the process is above the ceiling (%d MB) after %s.' % (maxmemory, day))
+    return created
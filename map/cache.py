@@ -0,0 +1,102 @@
+import hashlib
+import json
+import os
+import shutil
+
+
+# Folder where the cached results of the map are saved
+CACHE_DIR = '.cache'
+
+
+def file_key(path: str) -> dict:
+
+    '''
+
+    Return the key of a file: its name, size and modification time.
+
+    A cached result saved with this key is valid while the file is not modified.
+
+    '''
+
+    stat = os.stat(path)
+    return {'name': os.path.basename(path), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def digest(*parts) -> str:
+
+    '''
+
+    Return a SHA-256 hex digest of some parts (bytes, or values that can be saved in JSON).
+
+    '''
+
+    sha = hashlib.sha256()
+    for part in parts:
+        if not isinstance(part, bytes):
+            part = json.dumps(part, sort_keys=True, default=str).encode()
+        sha.update(part)
+        # Separate the parts, so ('ab', 'c') and ('a', 'bc') are different
+        sha.update(b'\0')
+    return sha.hexdigest()
+
+
+def file_digest(path: str) -> str:
+
+    '''
+
+    Return the SHA-256 hex digest of the content of a file.
+
+    '''
+
+    with open(path, 'rb') as file:
+        return digest(file.read())
+
+
+def cached_files(folder: str, key: str, names: list) -> list:
+
+    '''
+
+    Return the paths of the files saved with a key in an LRU folder (see save_files),
+    or None if they are not saved. The entry is marked as the most recently used.
+
+    '''
+
+    entry = os.path.join(folder, key)
+    paths = [os.path.join(entry, name) for name in names]
+    if not all(os.path.exists(path) for path in paths):
+        return None
+    os.utime(entry)
+    return paths
+
+
+def save_files(folder: str, key: str, paths: list, maxentries: int = 16) -> None:
+
+    '''
+
+    Save a copy of some files with a key in an LRU folder.
+
+    The folder keeps at most `maxentries` keys; the least recently used are removed.
+
+    '''
+
+    entry = os.path.join(folder, key)
+    os.makedirs(entry, exist_ok=True)
+    for path in paths:
+        shutil.copyfile(path, os.path.join(entry, os.path.basename(path)))
+    os.utime(entry)
+    # Remove the least recently used entries
+    entries = [os.path.join(folder, name) for name in os.listdir(folder)]
+    entries.sort(key=os.path.getmtime, reverse=True)
+    for old in entries[maxentries:]:
+        shutil.rmtree(old, ignore_errors=True)
+
+
+def clear_files(folder: str) -> None:
+
+    '''
+
+    Remove all the files saved in an LRU folder.
+
+    '''
+
+    shutil.rmtree(folder, ignore_errors=True)
@@ -0,0 +1,151 @@
+'''
+Command line interface of the map.
+
+Examples (from the folder with filled.csv, coords.csv and mytoken.txt):
+
+    python cli.py --day 2-Dec-17
+    python cli.py --start 1-Dec-17 --end 31-Dec-17 --workers 4 --outdir maps
+    python cli.py --day 2-Dec-17 --pipeline --workers 2
+    python cli.py --follow --interval 300 --format mp4
+    python cli.py --day 2-Dec-17 --pollutants PM10 NOX NO2 --frame circle --profile profile.json
+'''
+
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from datetime import datetime
+import profiling
+from batch import run_range
+from follow import follow
+from mymap import call_spiderwebs, plot_map
+from pipeline import run_pipeline
+from measurements import POLLUTANTS
+from scales import METHODS
+
+
+def day_arg(value):
+    '''Return the day if it has the format of filled.csv (2-Dec-17).'''
+    try:
+        datetime.strptime(value, '%d-%b-%y')
+    except ValueError:
+        raise argparse.ArgumentTypeError("invalid day '%s', use the format 2-Dec-17" % value)
+    return value
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Add the spiderwebs of the pollutants of each station to a map and save it as a GIF.')
+    dates = parser.add_mutually_exclusive_group(required=True)
+    dates.add_argument('--day', type=day_arg, help='the day of the map (2-Dec-17)')
+    dates.add_argument('--start', type=day_arg, help='the first day of a range of days (see --end)')
+    dates.add_argument('--follow', action='store_true',
+                       help='add a frame to the map for each hour appended to filled.csv, until Ctrl+C')
+    parser.add_argument('--end', type=day_arg, help='the last day of the range (the same as --start by default)')
+    parser.add_argument('--pollutants', nargs='+', choices=POLLUTANTS, default=POLLUTANTS,
+                        help='the pollutants drawn in the spiderwebs (at least 3)')
+    parser.add_argument('--frame', choices=['polygon', 'circle'], default='polygon', help='the frame of the spiderwebs')
+    parser.add_argument('--format', choices=['gif', 'png', 'mp4'], default='gif',
+                        help="'gif' renders the spiderwebs in memory, 'png' also saves each spiderweb as an image, 'mp4' is a video (only with --follow)")
+    parser.add_argument('--method', choices=list(METHODS) + ['fixed', 'none'], default='minmax',
+                        help="the scales of the pollutants ('none' scales each hour with its own records)")
+    parser.add_argument('--limits', type=json.loads, help="the limit of each pollutant for the method 'fixed', as JSON")
+    parser.add_argument('--workers', type=int, default=1, help='the number of processes rendering the spiderwebs')
+    parser.add_argument('--chunksize', type=int, help='the number of spiderwebs sent to a process at once')
+    parser.add_argument('--fill', type=float, default=0, help='the value of the stations without records in an hour')
+    parser.add_argument('--title', default='map', help='the name of the GIF of --day')
+    parser.add_argument('--outdir', default='maps', help='the folder of the GIFs of a range of days')
+    parser.add_argument('--maxmemory', type=int, help='the memory ceiling in megabytes of a range of days, for this process and its workers')
+    parser.add_argument('--rerender', dest='incremental', action='store_false',
+                        help='render every spiderweb of --day, even if it did not change since the last run')
+    parser.add_argument('--no-optimize', dest='optimize', action='store_false',
+                        help='encode each frame of the GIF with its own palette, so the frames that did not change are reused from the last run')
+    parser.add_argument('--pipeline', action='store_true',
+                        help='overlap the stages of --day (load, render, composite and encode) hour by hour, without reusing the last run')
+    parser.add_argument('--interval', type=float, default=60, help='the seconds between the checks of filled.csv of --follow')
+    parser.add_argument('--backlog', action='store_true', help='with --follow, also add the hours already in filled.csv')
+    parser.add_argument('--no-resume', dest='resume', action='store_false', help='create again the days finished by the last run')
+    parser.add_argument('--profile', nargs='?', const='-', metavar='FILE',
+                        help='save the time of each stage and the peak memory as JSON in FILE (stdout by default)')
+    args = parser.parse_args(argv)
+    if len(args.pollutants) < 3:
+        parser.error('the spiderwebs need at least 3 pollutants')
+    if args.method == 'fixed' and args.limits is None:
+        parser.error("the method 'fixed' needs --limits")
+    if args.limits is not None:
+        if not isinstance(args.limits, dict) or not all(isinstance(limit, (int, float)) for limit in args.limits.values()):
+            parser.error('--limits must be a JSON object with the limit (a number) of each pollutant')
+        missing = [pollutant for pollutant in args.pollutants if pollutant not in args.limits]
+        if missing:
+            parser.error('--limits has no limit for %s' % ', '.join(missing))
+    if args.end is not None:
+        if args.start is None:
+            parser.error('--end needs --start')
+        if datetime.strptime(args.end, '%d-%b-%y') < datetime.strptime(args.start, '%d-%b-%y'):
+            parser.error('--end is before --start')
+    if args.pipeline and (args.day is None or args.format == 'png'):
+        parser.error('--pipeline needs --day and the format gif')
+    if args.follow and args.method == 'robust':
+        parser.error("--follow updates the scales with each record, use the method 'minmax', 'zscore', 'fixed' or 'none'")
+    if (args.format == 'mp4' and not args.follow) or (args.follow and args.format == 'png'):
+        parser.error('--follow needs the format gif or mp4, and mp4 needs --follow')
+    if args.method == 'none':
+        args.method = None
+    return args
+
+
+def run(args):
+    '''Create the maps selected by the arguments. Returns the name of the GIFs created.'''
+    if args.follow:
+        outputtype = 'video' if args.format == 'mp4' else 'gif'
+        nframes = follow(args.title, outputtype, args.interval, args.method, args.limits, args.fill, args.pollutants, args.frame,
+                         backlog=args.backlog, workers=args.workers, optimize=args.optimize)
+        # Without frames the GIF is not created
+        return [args.title + ('.mp4' if args.format == 'mp4' else '.gif')] if nframes or args.format == 'mp4' else []
+    if args.pipeline:
+        nframes = run_pipeline(args.day, args.method, args.limits, args.workers, args.fill, args.title, args.pollutants, args.frame, optimize=args.optimize)
+    elif args.day is not None:
+        with profiling.stage('basemap'):
+            plot_map(args.day)
+        nframes = call_spiderwebs(args.day, args.method, args.limits, args.workers, args.chunksize, args.fill,
+                                  savepngs=args.format == 'png', incremental=args.incremental, title=args.title, pollutants=args.pollutants,
+                                  typeframe=args.frame, optimize=args.optimize)
+    if args.day is not None:
+        if nframes == 0:
+            sys.exit('%s has no hours with records of every pollutant: %s.gif was not created' % (args.day, args.title))
+        return [args.title + '.gif']
+    return run_range(args.start, args.end or args.start, args.outdir, args.method, args.limits, args.workers,
+                     args.chunksize, args.fill, args.maxmemory, args.resume, pollutants=args.pollutants,
+                     typeframe=args.frame, savepngs=args.format == 'png', optimize=args.optimize)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.profile is None:
+        run(args)
+        return
+    profiling.enable_profiling()
+    start = time.perf_counter()
+    created = run(args)
+    report = {
+        'arguments': {key: value for key, value in vars(args).items() if key != 'profile'},
+        'host': {'node': platform.node(), 'machine': platform.machine(), 'cpus': os.cpu_count(), 'python': platform.python_version()},
+        'outputs': created,
+        'total_seconds': round(time.perf_counter() - start, 6),
+    }
+    report.update(profiling.profile_report())
+    if args.pipeline:
+        report['note'] = "The stages of the pipeline overlap, so their times add up to more than 'pipeline'. The spiderwebs are rendered by the workers and not recorded."
+    elif args.workers > 1:
+        report['note'] = "The stages run by the workers are not recorded, only their total in 'render'."
+    if args.profile == '-':
+        json.dump(report, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.profile, 'w') as file:
+            json.dump(report, file, indent=2)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,18 +1,309 @@
-from tkinter import *
-from PIL import ImageTk, Image, ImageGrab
+from PIL import Image
 import numpy as np
 import cv2
-import time
-import imageio
+import json
+import os
+from cache import CACHE_DIR, digest, file_digest, file_key
+from profiling import stage
+from visualization_spiderwebs import GifWriter
 
 
-def draw_map(localizator, background, nameimages):
+# Size of the background in the frames, its position and the size of the frames
+BACKGROUND_SIZE = (1330, 1100)
+BACKGROUND_OFFSET = (-170, -200)
+FRAME_SIZE = (1000, 1000)
+# Size of the spiderwebs added to the map
+ICON_SIZE = (50, 50)
+
+# Center, zoom and margins (left, right, top, bottom) of the map images of plot_map
+MAP_CENTER = dict(lat=25.56, lon=-100.338)
+MAP_ZOOM = 8.4
+MAP_MARGINS = (80, 80, 100, 80)
+# Parameters of the detection of the stations in the localizator image
+HOUGH_PARAMS = dict(minDist=6, dp=1.1, param1=150, param2=15, minRadius=6, maxRadius=8)
+STATIONS_CACHE = os.path.join(CACHE_DIR, 'stations.json')
+
+
+def detect_circles(localizator, params=HOUGH_PARAMS):
+
+    '''
+
+    Detect the circles of the localizator image with the Hough transform.
+
+    Returns an array (circles x 2) with the (x, y) coordinates of the center of each circle.
+
+    '''
+
+    image = cv2.imread(localizator)
+    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
+    #detect circles in the image
+    circles = cv2.HoughCircles(gray, cv2.HOUGH_GRADIENT, **params)
+    # ensure at least some circles were found
+    if circles is None:
+        return np.zeros((0, 2), dtype=int)
+    # convert the (x, y) coordinates of the circles to integers
+    return np.round(circles[0, :, :2]).astype(int)
+
+
+def project_stations(lon, lat, imagesize, center=MAP_CENTER, zoom=MAP_ZOOM, margins=MAP_MARGINS):
+
+    '''
+
+    Project longitudes and latitudes to pixels of the map images saved by plot_map.
+
+    Uses the Web Mercator projection of mapbox (tiles of 512 pixels) centered
+    in the plot area of the image, which is the image without the margins
+    (left, right, top, bottom) of the plotly layout.
+
+    Returns an array (stations x 2) with the (x, y) coordinates of each station.
+
+    '''
+
+    def mercator(lon, lat):
+        world = 512 * 2**zoom
+        x = (np.asarray(lon) + 180) / 360 * world
+        sinlat = np.sin(np.radians(lat))
+        y = (0.5 - np.log((1 + sinlat) / (1 - sinlat)) / (4*np.pi)) * world
+        return x, y
+
+    left, right, top, bottom = margins
+    width, height = imagesize
+    cx = left + (width - left - right) / 2
+    cy = top + (height - top - bottom) / 2
+    x, y = mercator(lon, lat)
+    x0, y0 = mercator(center['lon'], center['lat'])
+    return np.column_stack((cx + x - x0, cy + y - y0))
+
+
+def match_stations(circles, expected):
+
+    '''
+
+    Order the detected circles as the expected positions of the stations.
+
+    The closest pairs (circle, station) are matched first. Stations without
+    a circle keep their expected position.
+
+    '''
+
+    positions = np.round(expected).astype(int)
+    if len(circles) == 0:
+        return positions
+    distances = np.linalg.norm(expected[:, None, :] - circles[None, :, :], axis=2)
+    for _ in range(min(len(circles), len(expected))):
+        station, circle = np.unravel_index(np.argmin(distances), distances.shape)
+        positions[station] = circles[circle]
+        distances[station, :] = np.inf
+        distances[:, circle] = np.inf
+    return positions
+
+
+def locate_stations(localizator, coords=None, params=HOUGH_PARAMS, project=False, cachefile=STATIONS_CACHE):
+
+    '''
+
+    Detect where the spiderwebs will be added.
+
+    The positions are saved in `cachefile` with the hash of the localizator
+    image, the Hough parameters and the coordinates of the stations, so later
+    runs with the same map skip the image analysis.
+
+    Parameters
+    ----------
+    localizator: String
+        String with the path of the image of the background with circles of size 15.
+    coords: pandas.DataFrame
+        The coordinates of the stations (coords.csv). If it is given, the positions
+        are in the order of coords.station.
+    params: dict
+        The parameters of cv2.HoughCircles.
+    project: bool
+        If True the positions are projected from coords without analysing the image.
+    cachefile: String
+        The JSON file with the positions already detected.
+
+    Returns
+    -------
+    numpy.ndarray
+        An array (stations x 2) with the (x, y) coordinates of the center of each station.
+
+    '''
+
+    if coords is not None:
+        imagesize = Image.open(localizator).size
+        expected = project_stations(coords.lon, coords.lat, imagesize)
+        if project:
+            return np.round(expected).astype(int)
+        stations = coords[['station', 'lon', 'lat']].astype(str).values.tolist()
+    else:
+        stations = None
+    key = digest(file_digest(localizator), params, stations)
+    try:
+        with open(cachefile, 'r') as file:
+            cached = json.load(file)
+    except (OSError, ValueError):
+        cached = {}
+    if key in cached:
+        return np.array(cached[key], dtype=int).reshape(-1, 2)
+    positions = detect_circles(localizator, params)
+    if coords is not None:
+        positions = match_stations(positions, expected)
+    cached[key] = positions.tolist()
+    os.makedirs(os.path.dirname(cachefile) or '.', exist_ok=True)
+    with open(cachefile, 'w') as file:
+        json.dump(cached, file)
+    return positions
+
+
+# Base frame already resized by load_background
+_backgrounds = {}
+
+
+def load_background(background):
+
+    '''
+
+    Return the base frame (RGB) with the background resized and placed as in every frame of the map.
+
+    The base frame is resized only once while the background file is not modified.
+
+    '''
+
+    key = (os.path.abspath(background), str(file_key(background)))
+    if key not in _backgrounds:
+        myimg = Image.open(background).convert('RGB')
+        resized = myimg.resize(BACKGROUND_SIZE, Image.LANCZOS)
+        frame = Image.new('RGB', FRAME_SIZE, 'white')
+        frame.paste(resized, BACKGROUND_OFFSET)
+        base = np.asarray(frame)
+        base.flags.writeable = False
+        _backgrounds.clear()
+        _backgrounds[key] = base
+    return _backgrounds[key]
+
+
+def to_frame(positions, imagesize):
+
+    '''
+
+    Convert coordinates of the localizator image to coordinates of the frames.
+
+    '''
+
+    scale = np.array(BACKGROUND_SIZE) / np.array(imagesize)
+    return np.round(positions*scale + BACKGROUND_OFFSET).astype(int)
+
+
+def load_icons(nameimages):
+
+    '''
+
+    Read the spiderwebs and resize them to ICON_SIZE. Returns an array (images x height x width x 4).
+
+    '''
+
+    icons = np.empty((len(nameimages), ICON_SIZE[1], ICON_SIZE[0], 4), dtype=np.uint8)
+    for i, nameimage in enumerate(nameimages):
+        myimg = Image.open(nameimage).convert('RGBA')
+        icons[i] = np.asarray(myimg.resize(ICON_SIZE, Image.LANCZOS))
+    return icons
+
+
+def compose_frame(base, icons, positions):
+
+    '''
+
+    Alpha-blend the icons over a copy of the base frame.
+
+    Parameters
+    ----------
+    base: numpy.ndarray
+        The base frame (height x width x 3).
+    icons: numpy.ndarray
+        The icons to add (icons x height x width x 4).
+    positions: numpy.ndarray
+        The (x, y) coordinates in the frame where the center of each icon is placed.
+
+    Returns
+    -------
+    numpy.ndarray
+        The new frame (height x width x 3).
+
+    '''
+
+    with stage('composite'):
+        frame = base.copy()
+        height, width = frame.shape[:2]
+        iconheight, iconwidth = icons.shape[1:3]
+        for icon, (x, y) in zip(icons, positions):
+            # Region of the frame covered by the icon, clipped to the frame
+            x0, y0 = x - iconwidth//2, y - iconheight//2
+            fx0, fy0 = max(x0, 0), max(y0, 0)
+            fx1, fy1 = min(x0 + iconwidth, width), min(y0 + iconheight, height)
+            if fx0 >= fx1 or fy0 >= fy1:
+                continue
+            part = icon[fy0-y0:fy1-y0, fx0-x0:fx1-x0]
+            alpha = part[:, :, 3:].astype(np.uint16)
+            region = frame[fy0:fy1, fx0:fx1]
+            region[:] = (part[:, :, :3]*alpha + region*(255 - alpha) + 127) // 255
+        return frame
+
+
+def map_layout(localizator, background, coords=None, project=False):
+
+    '''
+
+    Return the base frame and the positions in the frame where the icons of the stations are placed.
+
+    '''
+
+    base = load_background(background)
+    positions = locate_stations(localizator, coords, project=project)
+    imagesize = Image.open(localizator).size
+    return base, to_frame(positions, imagesize)
+
+
+def frame_icons(nameimages, first, last):
+
+    '''
+
+    Return the icons from `first` to `last` (not included), reading them from the
+    files only if `nameimages` is not an atlas already.
+
+    '''
+
+    if isinstance(nameimages, np.ndarray):
+        return nameimages[first:last]
+    return load_icons(nameimages[first:last])
+
+
+def map_frames(localizator, background, nameimages, coords=None, project=False):
+
+    '''
+
+    Generate the frames of the map, one for each group of spiderwebs (one for each station).
+
+    The parameters are the same of draw_map. The frames are RGB arrays generated in memory.
+
+    '''
+
+    base, positions = map_layout(localizator, background, coords, project)
+    ncoords = len(positions)
+    if ncoords == 0:
+        return
+    for ni in range(0, len(nameimages) - ncoords + 1, ncoords):
+        yield compose_frame(base, frame_icons(nameimages, ni, ni+ncoords), positions)
+
+
+def draw_map(localizator, background, nameimages, title='map', coords=None, project=False, iconkeys=None, manifest=None, optimize=True):
 
     '''
 
     Function that add images to a map
     and save the frames of the map with the new images to make a gif.
 
+    The frames are composed in memory, so no display is needed.
+
     Parameters
     ----------
     localizator: String
@@ -20,100 +311,67 @@ def draw_map(localizator, background, nameimages):
     background: String
         String with the path of the background image.
     nameimage: list
-        A list with the path of the images to add to the map.
-
-    '''
-
-    # Set the tkinter for the canvas
-    root = Tk() 
-    root.title('Images over image tkinter canvas')
-    root.resizable(width=False, height=False)
-    root.geometry('+1200+750')
-    root.geometry('1200x750')
-    root.configure(bg='SystemButtonFace')
-    # Set the background image
-    myimg = Image.open(background)
-    resized = myimg.resize((1330,1100), Image.ANTIALIAS)
-    mymap = ImageTk.PhotoImage(resized)
-    # Read the images ti add
-    mapimages = []
-    nimgs = len(nameimages)
-    i = 0
-    for i in range (nimgs):
-        myimg = Image.open(nameimages[i]);
-        resized = myimg.resize((50,50), Image.ANTIALIAS)
-        myimageresized = ImageTk.PhotoImage(resized)
-        mapimages.append(myimageresized)
-        time.sleep(1)
-    # Set the canvas with the background image
-    canvas1 = Canvas(root, width=1000, height=1000)
-    canvas1.pack()  
-    background = canvas1.create_image(-170, -200, anchor=NW, image=mymap)
-    # Detect where the images will be added
-    image = cv2.imread(localizator)
-    output = image.copy()
-    gray = cv2.cvtColor(image, cv2.COLOR_BGR2GRAY)
-    #detect circles in the image
-    circles = cv2.HoughCircles(gray,
-                               cv2.HOUGH_GRADIENT,
-                               minDist=6,
-                               dp=1.1,
-                               param1=150,
-                               param2=15,
-                               minRadius=6,
-                               maxRadius=8)
-    # ensure at least some circles were found
-    if circles is not None:
-        # convert the (x, y) coordinates and radius of the circles to integers
-        circles = np.round(circles[0, :]).astype("int")
-    xmaps = []
-    ymaps = []
-    # loop over the (x, y) coordinates and radius of the circles
-    for (x, y, r) in circles:
-        xmaps.append(x)
-        ymaps.append(y)
-    ncoords = len(xmaps)
-    
-    nf = 0
-    ni = 0
-    stop = False
-    imframes = []
-    
-    # Generation of the map
-    while stop!=False:
-        # Place the images in the frame
-        i = 0
-        canvasimages = []
-        for i in range (ncoords):
-            canvasimages.append(canvas1.create_image(xmaps[i], ymaps[i], anchor=NW, image=mapimages[ni]))
-            ni = ni+1
-        root.update_idletasks()
-        root.update()
-        # Save the frame in .png
-        frameName = 'imap'+str(nf)+'.png'
-        xc=root.winfo_rootx()+canvas1.winfo_x()
-        yc=root.winfo_rooty()+canvas1.winfo_y()
-        x1=xc+canvas1.winfo_width()
-        y1=yc+canvas1.winfo_height()
-        ImageGrab.grab((xc,yc,x1,y1)).save(frameName)
-        # Prepare for the new frame
-        time.sleep(1)
-        i = 0
-        for i in range (ncoords):
-            canvas1.delete(canvasimages[i])
-        nf=nf+1
-        imframes.append(frameName)
-        # Verify there are more images to add to a frame
-        if ni==nimgs:
-            stop=True
-        if stop:
-            # Generate the GIF
-            with imageio.get_writer(title + '.gif', mode='I', duration=1) as writer:
-                # Generates a GIF using the filenames stores previusly
-                for filename in imframes:
-                    image = imageio.imread(filename)
-                    writer.append_data(image)
-                for filename in set(imframes):
-                    os.remove(filename)
-            
-    root.mainloop()
+        A list with the path of the images to add to the map, or an atlas
+        (images x height x width x 4) with the icons already rendered (see
+        visualization_spiderwebs.render_icons).
+    title: String
+        The name of the GIF (title.gif).
+    coords: pandas.DataFrame
+        The coordinates of the stations, in the order of the images of each frame (see locate_stations).
+    project: bool
+        If True the stations are projected from coords instead of detected (see locate_stations).
+    iconkeys: list
+        The hash of each image (see RenderManifest.key). Used with `manifest`.
+    manifest: RenderManifest
+        If it is given with `iconkeys`, the GIF is only written again if its
+        frames changed. Without optimize, the frames whose images didn't
+        change are copied already encoded from the last GIF, and only the
+        rest are composed and encoded.
+    optimize: bool
+        If True the frames share one palette and each frame only stores the
+        box that changed since the previous one (see GifWriter), which makes
+        the GIF smaller and faster to write. But the frames depend on the
+        previous ones, so when any frame changes the whole GIF is encoded
+        again. With False the frames that didn't change are reused (see
+        `manifest`).
+
+    Returns
+    -------
+    int
+        The number of frames of the GIF. With 0 (no images or no stations)
+        the GIF is not written.
+
+    '''
+
+    base, positions = map_layout(localizator, background, coords, project)
+    ncoords = len(positions)
+    nframes = len(nameimages) // ncoords if ncoords else 0
+    if nframes == 0:
+        # A GIF without frames can't be read
+        return 0
+    incremental = manifest is not None and iconkeys is not None
+    framekeys = []
+    if incremental:
+        # The content of the background, not its modification time: plot_map copies it again in every run
+        backgroundkey = file_digest(background)
+        for nf in range(nframes):
+            framekeys.append(digest(iconkeys[nf*ncoords:(nf+1)*ncoords], positions.tolist(), backgroundkey, FRAME_SIZE))
+        gifkey = digest(framekeys, optimize)
+        if manifest.cached_gif(title + '.gif', gifkey):
+            return nframes
+    with GifWriter(title + '.gif', FRAME_SIZE, 1, optimize) as writer:
+        for nf in range(nframes):
+            first, last = nf*ncoords, (nf+1)*ncoords
+            if optimize or not incremental:
+                writer.append_data(compose_frame(base, frame_icons(nameimages, first, last), positions))
+                continue
+            data = manifest.cached_frame(framekeys[nf])
+            if data is None:
+                data = writer.encode(compose_frame(base, frame_icons(nameimages, first, last), positions))
+                manifest.save_frame(framekeys[nf], data)
+            writer.append_encoded(data)
+    if incremental:
+        # The optimized frames depend on the previous frame, so they are not saved one by one
+        manifest.record_frames([] if optimize else framekeys)
+        manifest.record_gif(title + '.gif', gifkey)
+    return nframes
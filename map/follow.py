@@ -0,0 +1,214 @@
+'''
+Follow mode of the map: the map grows with the records appended to filled.csv.
+
+The stations add the records of each hour at the end of filled.csv. The
+follower reads only the new lines (see MeasurementTail), updates the scales
+with them (see RunningScale) and, when an hour is complete, renders only the
+spiderwebs of that hour and appends its frame to the animation, which stays
+open. The frames already written are never encoded again.
+
+An hour is complete when the first record of a later hour arrives, because
+the records of an hour don't arrive at once.
+'''
+
+import time
+import numpy as np
+import pandas as pd
+import visualization_spiderwebs as vs
+from cache import file_key
+from create_map import ICON_SIZE, compose_frame, map_layout
+from measurements import POLLUTANTS, MeasurementTail, day_cube
+from mymap import hour_jobs, plot_map
+from scales import RunningScale, fixed_scale
+
+
+class MapFollower:
+
+    '''
+
+    Map (title.gif or title.mp4) that receives a new frame for each hour appended to the CSV.
+
+    The frames are drawn with the scales of the records of the hours
+    completed until that hour (included), so the first frames can have other
+    scales than the last ones. Each hour is added once, in order: late
+    records of an hour already added are ignored.
+
+    Parameters
+    ----------
+    title: String
+        The name of the animation, without the extension.
+    outputtype: {'gif', 'video'}
+        The type of the animation. The GIF can be read after each update,
+        the .mp4 only when the follower is closed.
+    method: {'minmax', 'zscore', 'fixed'}
+        The method of the scales. 'minmax' and 'zscore' are updated with
+        each new record, 'fixed' uses `limits`. With None each hour is scaled
+        with its own records.
+    limits: dict
+        The limit of each pollutant for the method 'fixed'.
+    fill: float
+        The value of the stations without records in an hour.
+    pollutants: list
+        The pollutants drawn in the spiderwebs.
+    typeframe: {'circle', 'polygon'}
+        The type of the frame of the spiderwebs.
+    path: String
+        The CSV with the measurements.
+    backlog: bool
+        If True the hours already in the CSV are added to the map. Otherwise
+        they only set the scales, and the map starts with the last hour.
+    workers: int
+        The number of processes rendering the spiderwebs of each hour.
+    optimize: bool
+        If True the GIF is encoded with a global palette and only the changes (see GifWriter).
+
+    '''
+
+    def __init__(self, title='map', outputtype='gif', method='minmax', limits=None, fill=0, pollutants=POLLUTANTS,
+                 typeframe='polygon', path='filled.csv', backlog=False, workers=1, optimize=True):
+        if method == 'fixed':
+            if limits is None:
+                raise ValueError("The method 'fixed' needs the limit of each pollutant.")
+            self.stats = None
+            self.scales = [fixed_scale(limits[pollutant]) for pollutant in pollutants]
+        elif method is None:
+            self.stats = None
+            self.scales = None
+        else:
+            # Fails now if the method can't be updated
+            RunningScale().scale(method)
+            self.stats = {pollutant: RunningScale() for pollutant in pollutants}
+            self.scales = None
+        self.method = method
+        self.fill = fill
+        self.pollutants = pollutants
+        self.typeframe = typeframe
+        self.backlog = backlog
+        self.workers = workers
+        self.tail = MeasurementTail(path)
+        self.coords = pd.read_csv('coords.csv')
+        self.titles = [str(station) for station in self.coords.station]
+        self.writer = vs.open_writer(title, outputtype, optimize)
+        self.layout = None
+        # Records of the last hour, which can still receive records
+        self.pending = None
+        # The last hour added to the map or to the scales
+        self.emitted = None
+        self.nframes = 0
+        self.late = 0
+        self.restarts = 0
+        self.started = False
+
+    def current_scales(self):
+        '''Return the scale of each pollutant with the records read until now.'''
+        if self.stats is None:
+            return self.scales
+        return [self.stats[pollutant].scale(self.method) for pollutant in self.pollutants]
+
+    def _add_hour(self, rows):
+        '''Render the spiderwebs of the records of one hour and append the frame. Hours without complete records are skipped.'''
+        hours, cube = day_cube(rows, self.titles, self.pollutants, self.fill)
+        if len(hours) == 0:
+            return
+        if self.layout is None:
+            self.layout = map_layout('map_x.png', 'map.png', self.coords)
+        base, positions = self.layout
+        jobs = hour_jobs(cube[0], self.nframes, self.titles, self.current_scales(), self.pollutants, self.typeframe)
+        icons = vs.render_icons(jobs, self.workers, size=ICON_SIZE)
+        self.writer.append_data(compose_frame(base, icons, positions))
+        self.nframes += 1
+
+    def update(self, final=False):
+
+        '''
+
+        Read the records appended to the CSV and add the frames of the hours completed.
+
+        The scales are updated with the records of each hour when the hour is
+        complete. The records of the hours already added (or used only for the
+        scales) are ignored and counted in `late`, also when the CSV is
+        replaced and read again from the start (counted in `restarts`).
+
+        With final=True the last hour is also added, as if it were complete.
+        Returns the number of frames added.
+
+        '''
+
+        rows = self.tail.read()
+        if self.tail.restarted:
+            # The records of the last hour are read again with the rest of the CSV
+            self.restarts += 1
+            self.pending = None
+        if self.emitted is not None:
+            old = rows['timestamp'].to_numpy() <= self.emitted
+            self.late += int(old.sum())
+            rows = rows.loc[~old]
+        if self.pending is not None:
+            rows = pd.concat([self.pending, rows], ignore_index=True)
+        if len(rows) == 0:
+            return 0
+        timestamps = rows['timestamp'].to_numpy()
+        hours = np.unique(timestamps)
+        complete = hours if final else hours[:-1]
+        before = self.nframes
+        for hour in complete:
+            hourrows = rows.loc[timestamps == hour]
+            if self.stats is not None:
+                for pollutant in self.pollutants:
+                    self.stats[pollutant].update(hourrows[pollutant].to_numpy())
+            # Without backlog, the hours already in the CSV before the last one only set the scales
+            if self.started or self.backlog or hour == hours[-1]:
+                self._add_hour(hourrows)
+            self.emitted = hour
+        self.started = True
+        self.pending = None if final else rows.loc[timestamps == hours[-1]]
+        if self.nframes > before:
+            self.writer.flush()
+        return self.nframes - before
+
+    def close(self):
+        '''Add the last hour and close the animation.'''
+        if self.writer is None:
+            return
+        try:
+            self.update(final=True)
+        finally:
+            self.writer.close()
+            self.writer = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def follow(title='map', outputtype='gif', interval=60, method='minmax', limits=None, fill=0, pollutants=POLLUTANTS,
+           typeframe='polygon', path='filled.csv', backlog=False, workers=1, optimize=True):
+
+    '''
+
+    Follow the CSV until it is interrupted (Ctrl+C), adding a frame to the map for each new hour.
+
+    The CSV is checked every `interval` seconds and only read when its size
+    or modification time changed. The other parameters are the same of
+    MapFollower. When it is interrupted the last hour is added and the
+    animation is closed.
+
+    Returns the number of frames of the map.
+
+    '''
+
+    plot_map(time.strftime('%d-%b-%y'))
+    with MapFollower(title, outputtype, method, limits, fill, pollutants, typeframe, path, backlog, workers, optimize) as follower:
+        key = None
+        try:
+            while True:
+                newkey = file_key(path)
+                if newkey != key:
+                    key = newkey
+                    follower.update()
+                time.sleep(interval)
+        except KeyboardInterrupt:
+            pass
+    return follower.nframes
@@ -2,11 +2,13 @@
 File to ejecut the complete program.
 '''
 
-from mymap import plot_map, call_spiderwebs
+from pipeline import run_pipeline
 
 
 pollutant = 'PM10'
 day = '2-Dec-17'
 
-plot_map(day)
-call_spiderwebs(day)
+# The base maps, the spiderwebs and the frames of the map are created at the same time.
+# The guard is needed by the processes of the pipeline where they are spawned (Windows and macOS)
+if __name__ == '__main__':
+    run_pipeline(day)
@@ -0,0 +1,124 @@
+import json
+import os
+import numpy as np
+from cache import CACHE_DIR, digest, file_key
+
+
+class RenderManifest:
+
+    '''
+
+    Manifest of the spiderwebs and the frames of the map already rendered.
+
+    For each output it stores a hash of its inputs: the normalized values of
+    the spiderweb (so the data and its scale), its title, color, labels and
+    frame, and the parameters of the output. Later runs only render the
+    outputs whose hash changed and reuse the rest.
+
+    The manifest keeps:
+    - The hash of each PNG image saved (by filename).
+    - The atlas of icons of the last run, with the hash of each icon.
+    - The encoded frames of the GIF of the map, by hash of their icons.
+    - The hash of the frames of each GIF written.
+
+    Parameters
+    ----------
+    folder: String
+        The folder where the manifest and the reused outputs are saved.
+
+    '''
+
+    def __init__(self, folder=os.path.join(CACHE_DIR, 'render')):
+        self.folder = folder
+        self.path = os.path.join(folder, 'manifest.json')
+        try:
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        except (OSError, ValueError):
+            data = {}
+        self.images = data.get('images', {})
+        self.icons = data.get('icons', [])
+        self.frames = data.get('frames', [])
+        self.gifs = data.get('gifs', {})
+
+    @staticmethod
+    def key(job, *style):
+        '''Return the hash of a job of visualization_spiderwebs.spiderweb_jobs and the style of its output.'''
+        N, typeframe, dataspider, titlespiderweb, color, spoke_labels, filename = job
+        values = np.ascontiguousarray(dataspider, dtype=float).tobytes()
+        return digest(values, N, typeframe, titlespiderweb, color, list(spoke_labels), style)
+
+    def save(self):
+        os.makedirs(self.folder, exist_ok=True)
+        with open(self.path, 'w') as file:
+            json.dump({'images': self.images, 'icons': self.icons, 'frames': self.frames, 'gifs': self.gifs}, file)
+
+    # PNG images
+
+    def stale_images(self, filenames, keys):
+        '''Return the positions of the images that are missing or were saved with other inputs.'''
+        return [i for i, (filename, key) in enumerate(zip(filenames, keys))
+                if self.images.get(filename) != key or not os.path.exists(filename)]
+
+    def record_images(self, filenames, keys):
+        self.images.update(zip(filenames, keys))
+        self.save()
+
+    # Atlas of icons
+
+    def cached_icons(self):
+        '''Return the atlas of icons of the last run and a dict with the row of each hash.'''
+        try:
+            atlas = np.load(os.path.join(self.folder, 'icons.npy'))
+        except (OSError, ValueError):
+            return None, {}
+        if len(atlas) != len(self.icons):
+            return None, {}
+        return atlas, {key: row for row, key in enumerate(self.icons)}
+
+    def record_icons(self, atlas, keys):
+        os.makedirs(self.folder, exist_ok=True)
+        np.save(os.path.join(self.folder, 'icons.npy'), atlas)
+        self.icons = list(keys)
+        self.save()
+
+    # Frames of the GIF
+
+    def _frame_path(self, key):
+        return os.path.join(self.folder, 'frames', key + '.gif')
+
+    def cached_frame(self, key):
+        '''Return the encoded frame saved with a hash, or None.'''
+        try:
+            with open(self._frame_path(key), 'rb') as file:
+                return file.read()
+        except OSError:
+            return None
+
+    def save_frame(self, key, data):
+        os.makedirs(os.path.join(self.folder, 'frames'), exist_ok=True)
+        with open(self._frame_path(key), 'wb') as file:
+            file.write(data)
+
+    def record_frames(self, keys):
+        '''Keep only the frames of the last GIF.'''
+        for key in set(self.frames) - set(keys):
+            if os.path.exists(self._frame_path(key)):
+                os.remove(self._frame_path(key))
+        self.frames = list(keys)
+        self.save()
+
+    # GIFs
+
+    def cached_gif(self, filename, key):
+        '''
+        Return True if the GIF exists and was written with the same frames.
+        A GIF written again by other means (see pipeline.py) is not cached.
+        '''
+        if not os.path.exists(filename):
+            return False
+        return self.gifs.get(os.path.abspath(filename)) == digest(key, file_key(filename))
+
+    def record_gif(self, filename, key):
+        self.gifs[os.path.abspath(filename)] = digest(key, file_key(filename))
+        self.save()
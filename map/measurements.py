@@ -0,0 +1,291 @@
+import io
+import json
+import os
+import numpy as np
+import pandas as pd
+from cache import CACHE_DIR, file_key
+from profiling import stage
+
+
+# Columns of filled.csv used by the map
+POLLUTANTS = ['PM2_5', 'PM10', 'NOX', 'NO2']
+WIND = ['velocity', 'direction']
+COLUMNS = ['timestamp', 'station'] + POLLUTANTS + WIND
+
+# Format of the timestamps of filled.csv
+TIMESTAMP_FORMAT = '%d-%b-%y %H'
+
+
+def read_measurements(path: str = 'filled.csv') -> pd.DataFrame:
+
+    '''
+
+    Read all the columns used by the map from the CSV in one pass.
+
+    The timestamps are parsed, the stations are categorical and the
+    pollutants and the wind are float32. The records are sorted by
+    timestamp and station.
+
+    '''
+
+    dtypes = {column: 'float32' for column in POLLUTANTS + WIND}
+    dtypes['station'] = 'category'
+    measurements = pd.read_csv(path, usecols=COLUMNS, dtype=dtypes)
+    timestamps = pd.to_datetime(measurements['timestamp'], format=TIMESTAMP_FORMAT)
+    measurements['timestamp'] = timestamps.astype('datetime64[ns]')
+    # Sort by timestamp and station for MeasurementIndex
+    order = np.lexsort((measurements['station'].cat.codes.to_numpy(), measurements['timestamp'].to_numpy()))
+    return measurements[COLUMNS].iloc[order].reset_index(drop=True)
+
+
+class MeasurementTail:
+
+    '''
+
+    Reader of the records appended to the CSV since the last read.
+
+    Each read parses only the bytes added after the last complete line read
+    before, so a CSV that grows every hour is never parsed again from the
+    start. A line still being written (without its end of line) is left for
+    the next read. If the file is replaced or truncated it is read again
+    from the start, and `restarted` is True after that read, so the caller
+    can drop the records it had already received.
+
+    Parameters
+    ----------
+    path: String
+        The path of the CSV (filled.csv).
+
+    '''
+
+    def __init__(self, path: str = 'filled.csv'):
+        self.path = path
+        self.header = None
+        self.offset = 0
+        self.inode = None
+        self.restarted = False
+
+    def read(self) -> pd.DataFrame:
+        '''Return the new records, parsed and sorted as in read_measurements (no rows if nothing was added).'''
+        with stage('csv_load'):
+            with open(self.path, 'rb') as file:
+                stat = os.fstat(file.fileno())
+                self.restarted = False
+                if stat.st_ino != self.inode or stat.st_size < self.offset:
+                    # Not on the first read
+                    self.restarted = self.inode is not None
+                    self.header = None
+                    self.offset = 0
+                    self.inode = stat.st_ino
+                if self.header is None:
+                    header = file.readline()
+                    if not header.endswith(b'\n'):
+                        # The header is not complete yet
+                        return read_measurements(io.BytesIO(b','.join(name.encode() for name in COLUMNS) + b'\n'))
+                    self.header = header
+                    self.offset = len(header)
+                file.seek(self.offset)
+                chunk = file.read(stat.st_size - self.offset)
+            # Only the complete lines
+            end = chunk.rfind(b'\n') + 1
+            self.offset += end
+            return read_measurements(io.BytesIO(self.header + chunk[:end]))
+
+
+def _save_columns(measurements: pd.DataFrame, folder: str, key: dict) -> None:
+    '''
+    Save each column in a .npy file. The key is written at the end,
+    so a folder with a missing or different key is never loaded.
+    '''
+    os.makedirs(folder, exist_ok=True)
+    keyfile = os.path.join(folder, 'key.json')
+    if os.path.exists(keyfile):
+        os.remove(keyfile)
+    np.save(os.path.join(folder, 'timestamp.npy'), measurements['timestamp'].to_numpy())
+    np.save(os.path.join(folder, 'station.npy'), measurements['station'].cat.codes.to_numpy())
+    for column in POLLUTANTS + WIND:
+        np.save(os.path.join(folder, column + '.npy'), measurements[column].to_numpy())
+    with open(keyfile, 'w') as file:
+        json.dump({'key': key, 'stations': [str(station) for station in measurements['station'].cat.categories]}, file)
+
+
+def _load_columns(folder: str, key: dict):
+    '''
+    Load the columns saved by _save_columns as memory-mapped arrays.
+    Returns None if they were saved with a different key.
+    '''
+    try:
+        with open(os.path.join(folder, 'key.json'), 'r') as file:
+            info = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if info['key'] != key:
+        return None
+    columns = {}
+    for column in COLUMNS:
+        columns[column] = np.load(os.path.join(folder, column + '.npy'), mmap_mode='r')
+    columns['station'] = pd.Categorical.from_codes(columns['station'], categories=info['stations'])
+    return pd.DataFrame(columns, columns=COLUMNS, copy=False)
+
+
+def load_measurements(path: str = 'filled.csv', cachedir: str = CACHE_DIR) -> pd.DataFrame:
+
+    '''
+
+    Return all the measurements of the CSV used by the map.
+
+    The CSV is parsed only the first time (see read_measurements). Its columns
+    are cached as memory-mapped NumPy files in `cachedir`, keyed on the size and
+    modification time of the CSV, so later runs load them without parsing.
+
+    '''
+
+    with stage('csv_load'):
+        key = file_key(path)
+        folder = os.path.join(cachedir, 'measurements')
+        measurements = _load_columns(folder, key)
+        if measurements is None:
+            measurements = read_measurements(path)
+            _save_columns(measurements, folder, key)
+        return measurements
+
+
+def pollutant_view(measurements: pd.DataFrame, pollutant: str) -> pd.DataFrame:
+
+    '''
+
+    Return the columns of one pollutant: timestamp, station, the pollutant and the wind.
+
+    With pandas copy-on-write the columns are shared with `measurements`.
+
+    '''
+
+    return measurements[['timestamp', 'station', pollutant] + WIND]
+
+
+def _is_sorted(timestamps: np.ndarray, codes: np.ndarray) -> bool:
+    '''
+    Verify the records are sorted by timestamp and, in the same timestamp, by station.
+    '''
+    dt = np.diff(timestamps)
+    dc = np.diff(codes)
+    return bool(np.all(dt >= np.timedelta64(0)) and np.all(dc[dt == np.timedelta64(0)] >= 0))
+
+
+class MeasurementIndex:
+
+    '''
+
+    Index of the measurements sorted by timestamp and station.
+
+    The records of a day, of an hour and of a station in an hour are contiguous,
+    so they are returned as slices found with a binary search (O(log n)).
+    All the records of an hour must have the same timestamp, as in filled.csv.
+
+    Parameters
+    ----------
+    measurements: pandas.DataFrame
+        The measurements returned by load_measurements. They are sorted only
+        if they are not sorted yet.
+
+    '''
+
+    def __init__(self, measurements: pd.DataFrame):
+        timestamps = measurements['timestamp'].to_numpy()
+        codes = measurements['station'].cat.codes.to_numpy()
+        if not _is_sorted(timestamps, codes):
+            order = np.lexsort((codes, timestamps))
+            measurements = measurements.iloc[order].reset_index(drop=True)
+            timestamps = timestamps[order]
+            codes = codes[order]
+        self.measurements = measurements
+        self.timestamps = timestamps
+        self.codes = codes
+        self.stations = measurements['station'].cat.categories
+
+    def _rows(self, start: pd.Timestamp, end: pd.Timestamp) -> tuple:
+        '''Return the first and the last (not included) row between two timestamps.'''
+        first, last = np.searchsorted(self.timestamps, [start.to_datetime64(), end.to_datetime64()])
+        return first, last
+
+    def day(self, date) -> pd.DataFrame:
+        '''Return the records of the day of `date`.'''
+        start = pd.Timestamp(date).normalize()
+        first, last = self._rows(start, start + pd.Timedelta(days=1))
+        return self.measurements.iloc[first:last]
+
+    def hour(self, hour, station: str = None) -> pd.DataFrame:
+        '''Return the records of the hour of `hour`, only of one station if `station` is not None.'''
+        start = pd.Timestamp(hour).floor('h')
+        first, last = self._rows(start, start + pd.Timedelta(hours=1))
+        if station is not None:
+            code = self.stations.get_indexer([station])[0]
+            if code < 0:
+                last = first
+            else:
+                first, last = first + np.searchsorted(self.codes[first:last], [code, code + 1])
+        return self.measurements.iloc[first:last]
+
+
+def common_hours(rows: pd.DataFrame, pollutants: list = POLLUTANTS) -> np.ndarray:
+
+    '''
+
+    Return the sorted hours where every pollutant has at least one complete
+    record (the pollutant and the wind).
+
+    '''
+
+    timestamps = rows['timestamp'].to_numpy()
+    wind = rows[WIND].notna().all(axis=1).to_numpy()
+    hours = None
+    for pollutant in pollutants:
+        valid = wind & rows[pollutant].notna().to_numpy()
+        pollutanthours = np.unique(timestamps[valid])
+        if hours is None:
+            hours = pollutanthours
+        else:
+            hours = np.intersect1d(hours, pollutanthours, assume_unique=True)
+    return hours
+
+
+def day_cube(inday: pd.DataFrame, stations: list, pollutants: list = POLLUTANTS, fill: float = 0) -> tuple:
+
+    '''
+
+    Reshape the records of a day in a dense cube (hours x stations x pollutants).
+
+    Parameters
+    ----------
+    inday: pandas.DataFrame
+        The records of the day (see MeasurementIndex.day).
+    stations: list
+        A list with the name of the stations, in the order of the cube.
+    pollutants: list
+        A list with the name of the pollutants, in the order of the cube.
+    fill: float
+        The value of the stations without a complete record of a pollutant in an hour.
+
+    Returns
+    -------
+    hours: numpy.ndarray
+        The hours in common of all the pollutants (see common_hours).
+    cube: numpy.ndarray
+        The values of each pollutant of each station in each hour.
+
+    '''
+
+    rows = inday.loc[inday['station'].isin(stations)]
+    hours = common_hours(rows, pollutants)
+    # Position of each record in the cube
+    timestamps = rows['timestamp'].to_numpy()
+    hourpos = np.minimum(np.searchsorted(hours, timestamps), max(len(hours) - 1, 0))
+    inhours = (hours[hourpos] == timestamps) if len(hours) else np.zeros(len(rows), dtype=bool)
+    stationpos = pd.Index(stations).get_indexer(rows['station'].astype(str))
+    # Records without wind are incomplete for every pollutant
+    values = rows[pollutants].to_numpy(dtype=float)
+    values[~rows[WIND].notna().all(axis=1).to_numpy()] = np.nan
+    cube = np.full((len(hours), len(stations), len(pollutants)), np.nan)
+    cube[hourpos[inhours], stationpos[inhours]] = values[inhours]
+    cube[np.isnan(cube)] = fill
+    return hours, cube
@@ -2,20 +2,47 @@ import pandas as pd
 import plotly
 import plotly.graph_objects as go
 import visualization_spiderwebs as vs
-from create_map import draw_map
-import time
+from create_map import ICON_SIZE, MAP_CENTER, MAP_ZOOM, draw_map
+from scales import compute_scales, load_scales, save_scales
+from measurements import POLLUTANTS, MeasurementIndex, day_cube, load_measurements
+from manifest import RenderManifest
+from profiling import stage
+from cache import CACHE_DIR, cached_files, clear_files, digest, file_digest, file_key, save_files
+import os
+import shutil
 
-def plot_map(day: str) -> None:
+
+# Folder with the base maps already rendered by plot_map
+BASEMAP_CACHE = os.path.join(CACHE_DIR, 'basemaps')
+# File with the scales computed by global_scales
+SCALES_CACHE = os.path.join(CACHE_DIR, 'scales.json')
+
+
+def plot_map(day: str, width: int = 700, height: int = 500, refresh: bool = False, maxentries: int = 16) -> None:
 
     '''
 
     Save two images of the day (day) selected:
     1. Image of the map.
     2. Image of the map with circles of size 15 in the stations.
+
+    The images only depend on coords.csv, the center and zoom of the map and
+    the size of the images, so they are cached in BASEMAP_CACHE with a hash of
+    them and copied from there in later runs. The cache keeps the `maxentries`
+    most recently used maps. Use refresh=True (or clear_map_cache) after
+    changing the style of the map.
     
     '''
 
-    
+    names = ['map.png', 'map_x.png']
+    key = digest(file_digest('coords.csv'), MAP_CENTER, MAP_ZOOM, width, height)
+    cached = None if refresh else cached_files(BASEMAP_CACHE, key, names)
+    if cached is not None:
+        for path, name in zip(cached, names):
+            # copy2 keeps the modification time, so the caches keyed on it stay valid
+            shutil.copy2(path, name)
+        return
+
     # Read the station coordinates
     coords = pd.read_csv('coords.csv')
 
@@ -75,8 +102,8 @@ def plot_map(day: str) -> None:
         autosize=True,
         mapbox=dict(
             accesstoken=token,
-            center=dict(lat=25.56, lon=-100.338),
-            zoom=8.4, 
+            center=MAP_CENTER,
+            zoom=MAP_ZOOM,
         )
     )
 
@@ -88,124 +115,179 @@ def plot_map(day: str) -> None:
     figure1 = go.Figure(data=data1, layout=layout, frames=frames1)
 
     # Save the images from the figures
-    figure.write_image("map.png")
-    figure1.write_image("map_x.png")
+    figure.write_image("map.png", width=width, height=height)
+    figure1.write_image("map_x.png", width=width, height=height)
+    save_files(BASEMAP_CACHE, key, names, maxentries)
+
+
+def clear_map_cache() -> None:
+    '''
+    Remove all the base maps cached by plot_map.
+    '''
+    clear_files(BASEMAP_CACHE)
+
+
+def global_scales(method: str = 'minmax', limits: dict = None, pollutants: list = POLLUTANTS, **kwargs) -> dict:
+
+    '''
+
+    Return the scale of each pollutant of `pollutants` computed over all the records of filled.csv.
+
+    The scales are saved in SCALES_CACHE with the size and modification time of
+    filled.csv, so later runs with the same file and method skip reading it again.
+
+    '''
+
+    key = {'file': file_key('filled.csv'), 'method': method, 'limits': limits, 'pollutants': pollutants, 'params': kwargs}
+    scales = load_scales(SCALES_CACHE, key)
+    if scales is None:
+        dataframe = None
+        if method != 'fixed':
+            dataframe = load_measurements('filled.csv')
+        scales = compute_scales(dataframe, pollutants, method, limits, **kwargs)
+        save_scales(scales, SCALES_CACHE, key)
+    return scales
+
+
+def day_scales(method: str = 'minmax', limits: dict = None, pollutants: list = POLLUTANTS) -> list:
+
+    '''
+
+    Return the scales shared by all the spiderwebs of a day, in the order of
+    `pollutants` (see global_scales). None with method None, so each hour is
+    scaled with its own records.
+
+    '''
+
+    if method is None:
+        return None
+    scales = global_scales(method, limits, pollutants)
+    return [scales[pollutant] for pollutant in pollutants]
+
+
+def hour_jobs(values, h: int, titles: list, scales: list = None, pollutants: list = POLLUTANTS, typeframe: str = 'polygon') -> list:
+
+    '''
+
+    Return the jobs of visualization_spiderwebs with the spiderwebs of the
+    hour number `h` (from 0) of a day, one for each station of `titles`.
+
+    `values` has the values of the hour (stations x pollutants, see day_cube).
+
+    '''
+
+    spoke_labels = [pollutant.replace('_', ',') for pollutant in pollutants]
+    colors = ['b', 'r', 'g', 'm', 'y']
+    mycolors = [colors[i % len(colors)] for i in range(len(titles))]
+    title = 'hour'+str(h+1)+'_'
+    # One dataset for each pollutant with the values of all the stations
+    return vs.spiderweb_jobs(values.T, 4, title, titles, spoke_labels, mycolors, typeframe, scales)
+
 
+def load_day(index: MeasurementIndex, coords: pd.DataFrame, day: str, fill: float = 0, pollutants: list = POLLUTANTS) -> tuple:
 
-def call_spiderwebs(day: str) -> None:
+    '''
+
+    Read the records of a day from the index and reshape them in a cube
+    (hours x stations x pollutants, see day_cube).
+
+    Returns the name of the stations (in the order of coords), the hours and the cube.
+
+    '''
+
+    with stage('filter'):
+        date = pd.to_datetime(day, format='%d-%b-%y')
+        titles = [str(station) for station in coords.station]
+        hours, cube = day_cube(index.day(date), titles, pollutants, fill)
+    return titles, hours, cube
+
+
+def day_jobs(index: MeasurementIndex, coords: pd.DataFrame, day: str, scales: list = None, fill: float = 0,
+             pollutants: list = POLLUTANTS, typeframe: str = 'polygon') -> list:
+
+    '''
+
+    Return the jobs of visualization_spiderwebs with the spiderwebs of every
+    hour of a day, one for each station in the order of coords and one line
+    for each pollutant of `pollutants`.
+
+    Only the records of the day are read from the index (see load_day).
+
+    '''
+
+    titles, hours, cube = load_day(index, coords, day, fill, pollutants)
+    jobs=[]
+    for h in range(len(hours)):
+        jobs.extend(hour_jobs(cube[h], h, titles, scales, pollutants, typeframe))
+    return jobs
+
+
+def render_map(jobs: list, coords: pd.DataFrame, title: str = 'map', workers: int = 1, chunksize: int = None, savepngs: bool = False, manifest: RenderManifest = None,
+               optimize: bool = True, project: bool = False) -> int:
+
+    '''
+
+    Render the spiderwebs of the jobs and add them to the map (title.gif).
+    Returns the number of frames of the map. `optimize` and `project` are passed to draw_map.
+
+    '''
+
+    with stage('render'):
+        if savepngs:
+            # render_batch returns when all the images are saved
+            nameimages = vs.render_batch(jobs, workers, chunksize, manifest=manifest)
+            iconkeys = [RenderManifest.key(job, 'png') for job in jobs]
+        else:
+            nameimages = vs.render_icons(jobs, workers, chunksize, ICON_SIZE, manifest=manifest)
+            iconkeys = [RenderManifest.key(job, 'icon', ICON_SIZE) for job in jobs]
+    return draw_map('map_x.png', 'map.png', nameimages, title, coords=coords, project=project, iconkeys=iconkeys, manifest=manifest, optimize=optimize)
+
+
+def call_spiderwebs(day: str, method: str = 'minmax', limits: dict = None, workers: int = 1, chunksize: int = None, fill: float = 0, savepngs: bool = False, incremental: bool = True, title: str = 'map',
+                    pollutants: list = POLLUTANTS, typeframe: str = 'polygon', optimize: bool = True) -> int:
     '''
     Call function that create the spiderwebs
+
+    All the hours of the day share the scales returned by global_scales for the
+    method selected ('minmax', 'zscore', 'robust' or 'fixed' with the limit of
+    each pollutant). With method None each hour is scaled with its own records.
+
+    The spiderwebs of all the hours are rendered in one batch split in
+    `workers` processes (see visualization_spiderwebs.render_batch).
+    Stations without records in an hour are drawn with the value `fill`.
+
+    The spiderwebs are rendered directly as icons of the map, in one atlas in
+    memory. With savepngs=True they are saved as PNG images and the map
+    is composed from the images.
+
+    With incremental=True a RenderManifest keeps the hash of the inputs of
+    each spiderweb and frame, so only the spiderwebs and frames of the map
+    whose data, scale or style changed since the last run are rendered again.
+
+    Each spiderweb has one line for each pollutant of `pollutants` and a
+    frame of type `typeframe` ('polygon' or 'circle').
+
+    With optimize=True (the default) the frames of the GIF share one palette
+    and only store what changed since the previous frame, which makes the
+    GIF smaller and faster to encode, but the whole GIF is encoded again when
+    any frame changes. With optimize=False each frame has its own palette, so
+    with incremental=True the frames that didn't change are copied already
+    encoded from the last run and only the changed ones are encoded.
+
+    The map is saved in title.gif. Returns its number of frames. If the day
+    has no hours with records of every pollutant it returns 0 and the GIF is
+    not written.
     '''
 
-    # Colums to extract from the CSV
-    columns1 = ['timestamp', 'station', 'PM2_5', 'velocity', 'direction']
-    dataframe1 = pd.read_csv('filled.csv', usecols=columns1).dropna()
-    columns2 = ['timestamp', 'station', 'PM10', 'velocity', 'direction']
-    dataframe2 = pd.read_csv('filled.csv', usecols=columns2).dropna()
-    columns3 = ['timestamp', 'station', 'NOX', 'velocity', 'direction']
-    dataframe3 = pd.read_csv('filled.csv', usecols=columns3).dropna()
-    columns4 = ['timestamp', 'station', 'NO2', 'velocity', 'direction']
-    dataframe4 = pd.read_csv('filled.csv', usecols=columns4).dropna()
-    
+    # Scales shared by all the spiderwebs of the day
+    scales = day_scales(method, limits, pollutants)
+
+    # Read all the columns of the CSV once and index them by day
+    index = MeasurementIndex(load_measurements('filled.csv'))
+
     # Read the station coordinates
     coords = pd.read_csv('coords.csv')
 
-    # Filter the records of the day selected
-    dataset1 = coords.merge(dataframe1.loc[dataframe1['timestamp'].str.startswith(day)], on='station')
-    dataset2 = coords.merge(dataframe2.loc[dataframe2['timestamp'].str.startswith(day)], on='station')
-    dataset3 = coords.merge(dataframe3.loc[dataframe3['timestamp'].str.startswith(day)], on='station')
-    dataset4 = coords.merge(dataframe4.loc[dataframe4['timestamp'].str.startswith(day)], on='station')
-
-    # Convert strings variables to datetime variables
-    strfdt = '%d-%b-%y %H'
-    dataset1['timestamp'] = pd.to_datetime(dataset1['timestamp'], format=strfdt)
-    dataset2['timestamp'] = pd.to_datetime(dataset2['timestamp'], format=strfdt)
-    dataset3['timestamp'] = pd.to_datetime(dataset3['timestamp'], format=strfdt)
-    dataset4['timestamp'] = pd.to_datetime(dataset4['timestamp'], format=strfdt)
-    
-
-    # Filter all the hours registered in the day selected
-    hours1 = dataset1.timestamp.unique()
-    hours1.sort()
-    hours2 = dataset2.timestamp.unique()
-    hours2.sort()
-    hours3 = dataset3.timestamp.unique()
-    hours3.sort()
-    hours4 = dataset4.timestamp.unique()
-    hours4.sort()
-    hours = []
-    # Verify hours in common
-    for i in hours1:
-        if (i not in hours) and (i in hours2) and (i in hours3) and (i in hours4):
-            hours.append(i)
-    h=0
-    nameimages=[]
-    for hour in hours:
-        titles = []
-        mydataset = []
-        # Select the records of the hour
-        data1 = dataset1.loc[dataset1['timestamp'] == hour]
-        data2 = dataset2.loc[dataset2['timestamp'] == hour]
-        data3 = dataset3.loc[dataset3['timestamp'] == hour]
-        data4 = dataset4.loc[dataset4['timestamp'] == hour]
-
-        # Organize by station
-        xcoords, ycoords = coords.lon, coords.lat        
-
-        mydataset1 = []
-        mydataset2 = []
-        mydataset3 = []
-        mydataset4 = []
-        for st in coords.station:
-            station = str(st)
-            titles.append(station)
-            mydata1 = data1.loc[data1['station'] == station]
-            mydata2 = data2.loc[data2['station'] == station]
-            mydata3 = data3.loc[data3['station'] == station]
-            mydata4 = data4.loc[data4['station'] == station]
-
-            verify1 = len(mydata1)
-            verify2 = len(mydata2)
-            verify3 = len(mydata3)
-            verify4 = len(mydata4)
-            if(verify1==0):
-                mydataset1.append(0)
-            if(verify2==0):
-                mydataset2.append(0)
-            if(verify3==0):
-                mydataset3.append(0)
-            if(verify4==0):
-                mydataset4.append(0)
-        
-            for x in mydata1.PM2_5:
-                mydataset1.append(x)
-            for x in mydata2.PM10:
-                mydataset2.append(x)
-            for x in mydata3.NOX:
-                mydataset3.append(x)
-            for x in mydata4.NO2:
-                mydataset4.append(x)
-        mydataset.append(mydataset1)
-        mydataset.append(mydataset2)
-        mydataset.append(mydataset3)
-        mydataset.append(mydataset4)
-        h=h+1
-        total = len(titles)
-        title = 'hour'+str(h)+'_'
-        nstations = len(coords)
-        for s in range(nstations):
-            nn=s+1
-            nameimages.append(title+str(nn)+'.png')
-        spoke_labels = ['PM2,5','PM10','NOX','NO2']
-        colors = ['b', 'r', 'g', 'm', 'y']
-        nc = len(colors)
-        mycolors = []
-        c = 0
-        for i in range(total):
-            mycolors.append(colors[c])
-            c = c+1
-            if c >= nc:
-                c = 0
-        vs.create_spiderwebs(mydataset, 4, total, title, titles, spoke_labels, mycolors, 'polygon')
-    time.sleep(5)
-    draw_map('map_x.png', 'map.png', nameimages)
+    jobs = day_jobs(index, coords, day, scales, fill, pollutants, typeframe)
+    manifest = RenderManifest() if incremental else None
+    return render_map(jobs, coords, title, workers, chunksize, savepngs, manifest, optimize)
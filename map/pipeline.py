@@ -0,0 +1,188 @@
+'''
+Pipeline of the map with its stages running at the same time.
+
+The map of a day is created hour by hour through four stages connected by
+bounded queues:
+
+    load (CSV, filter, normalize) -> render (pool of processes) -> composite -> encode (GIF)
+
+While hour N is rendered by the pool, hour N+1 is loaded and normalized and
+hour N-1 is composited and encoded, and the base maps (plotly and Kaleido)
+are saved while the first hours are loaded and rendered. The I/O of the CSV,
+the images and the GIF and the blending run in threads, the spiderwebs
+(matplotlib) in processes, so they overlap instead of waiting for each other.
+
+When a stage is slower than the next ones its queue fills and the previous
+stages wait (backpressure), so at most a few hours are in memory at once.
+'''
+
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import matplotlib
+import numpy as np
+import pandas as pd
+import visualization_spiderwebs as vs
+from create_map import FRAME_SIZE, ICON_SIZE, GifWriter, compose_frame, map_layout
+from measurements import POLLUTANTS, MeasurementIndex, load_measurements
+from mymap import day_scales, hour_jobs, load_day, plot_map
+from profiling import stage
+
+
+# End of the items of a queue
+_DONE = None
+
+
+def _load_day(day: str, method: str, limits: dict, fill: float, pollutants: list):
+    '''Return the coordinates, the name of the stations, the scales and the cube (hours x stations x pollutants) of a day.'''
+    scales = day_scales(method, limits, pollutants)
+    index = MeasurementIndex(load_measurements('filled.csv'))
+    coords = pd.read_csv('coords.csv')
+    titles, hours, cube = load_day(index, coords, day, fill, pollutants)
+    return coords, titles, scales, cube
+
+
+def _render_hour(jobs: list) -> np.ndarray:
+    '''Render the icons of the spiderwebs of one hour (run in the processes of the pool).'''
+    return vs.render_icons(jobs, size=ICON_SIZE)
+
+
+async def _load(loop, threads, day, method, limits, fill, pollutants, typeframe, coordsready, loaded):
+    '''Stage 1: read the day and put the jobs of each hour in `loaded`.'''
+    coords, titles, scales, cube = await loop.run_in_executor(threads, _load_day, day, method, limits, fill, pollutants)
+    coordsready.set_result(coords)
+    for h in range(len(cube)):
+        jobs = await loop.run_in_executor(threads, hour_jobs, cube[h], h, titles, scales, pollutants, typeframe)
+        await loaded.put(jobs)
+    await loaded.put(_DONE)
+
+
+async def _render(loop, pool, loaded, rendered):
+    '''
+    Stage 2: send each hour to the pool and put its future in `rendered`.
+    The hours in the pool are bounded by the size of `rendered`.
+    '''
+    while True:
+        jobs = await loaded.get()
+        if jobs is _DONE:
+            break
+        await rendered.put(loop.run_in_executor(pool, _render_hour, jobs))
+    await rendered.put(_DONE)
+
+
+async def _composite(loop, threads, basemap, coordsready, rendered, composed):
+    '''Stage 3: add the icons of each hour to the map and put the frame in `composed`.'''
+    coords = await coordsready
+    # The positions of the stations need the base maps
+    await basemap
+    base, positions = await loop.run_in_executor(threads, map_layout, 'map_x.png', 'map.png', coords)
+    while True:
+        future = await rendered.get()
+        if future is _DONE:
+            break
+        icons = await future
+        frame = await loop.run_in_executor(threads, compose_frame, base, icons, positions)
+        await composed.put(frame)
+    await composed.put(_DONE)
+
+
+async def _encode(loop, threads, title, optimize, composed):
+    '''Stage 4: write each frame in the GIF. Returns the number of frames.'''
+    nframes = 0
+    with GifWriter(title + '.gif', FRAME_SIZE, 1, optimize) as writer:
+        while True:
+            frame = await composed.get()
+            if frame is _DONE:
+                break
+            await loop.run_in_executor(threads, writer.append_data, frame)
+            nframes += 1
+    return nframes
+
+
+async def map_pipeline(day: str, method: str = 'minmax', limits: dict = None, workers: int = 1, fill: float = 0, title: str = 'map',
+                       pollutants: list = POLLUTANTS, typeframe: str = 'polygon', queuesize: int = 2, optimize: bool = True) -> int:
+
+    '''
+
+    Create the map of a day (title.gif) with the stages of the pipeline running at the same time.
+
+    The parameters are the same of call_spiderwebs and run_pipeline. If a
+    stage fails the rest are cancelled and its exception is raised.
+
+    '''
+
+    loop = asyncio.get_running_loop()
+    # One thread for each stage that runs in a thread, and one more for the base maps
+    threads = ThreadPoolExecutor(max_workers=4)
+    pool = ProcessPoolExecutor(max_workers=max(workers or os.cpu_count() or 1, 1), initializer=matplotlib.use, initargs=('Agg',))
+    loaded = asyncio.Queue(queuesize)
+    # The hours being rendered are in this queue, so it has room for all the workers
+    rendered = asyncio.Queue(max(queuesize, workers or os.cpu_count() or 1))
+    composed = asyncio.Queue(queuesize)
+    coordsready = loop.create_future()
+    basemap = loop.run_in_executor(threads, plot_map, day)
+    tasks = [
+        asyncio.ensure_future(_load(loop, threads, day, method, limits, fill, pollutants, typeframe, coordsready, loaded)),
+        asyncio.ensure_future(_render(loop, pool, loaded, rendered)),
+        asyncio.ensure_future(_composite(loop, threads, basemap, coordsready, rendered, composed)),
+        asyncio.ensure_future(_encode(loop, threads, title, optimize, composed)),
+    ]
+    try:
+        with stage('pipeline'):
+            results = await asyncio.gather(*tasks)
+    except BaseException:
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        raise
+    finally:
+        pool.shutdown(cancel_futures=True)
+        threads.shutdown(cancel_futures=True)
+    return results[-1]
+
+
+def run_pipeline(day: str, method: str = 'minmax', limits: dict = None, workers: int = 1, fill: float = 0, title: str = 'map',
+                 pollutants: list = POLLUTANTS, typeframe: str = 'polygon', queuesize: int = 2, optimize: bool = True) -> int:
+
+    '''
+
+    Save the base maps of a day and add the spiderwebs to the map (title.gif), overlapping the stages.
+
+    It creates the same map of plot_map and call_spiderwebs, but the hours
+    flow through the stages one by one: the first frames are encoded while
+    the last hours are still being read and rendered.
+
+    Parameters
+    ----------
+    day: String
+        The day of the map (2-Dec-17).
+    method: {'minmax', 'zscore', 'robust', 'fixed'}
+        The method of the scales (see call_spiderwebs). With None each hour
+        is scaled with its own records.
+    limits: dict
+        The limit of each pollutant for the method 'fixed'.
+    workers: int
+        The number of processes rendering the spiderwebs. With None, one for each CPU.
+    fill: float
+        The value of the stations without records in an hour.
+    title: String
+        The name of the GIF (title.gif).
+    pollutants: list
+        The pollutants drawn in the spiderwebs.
+    typeframe: {'circle', 'polygon'}
+        The type of the frame of the spiderwebs.
+    queuesize: int
+        The number of hours that each queue between two stages holds. When a
+        queue is full the stage before it waits, which bounds the memory.
+    optimize: bool
+        If True the GIF is encoded with a global palette and only the changes (see GifWriter).
+
+    Returns
+    -------
+    int
+        The number of frames of the map. With 0 (no hours with records of
+        every pollutant) the GIF is not written.
+
+    '''
+
+    return asyncio.run(map_pipeline(day, method, limits, workers, fill, title, pollutants, typeframe, queuesize, optimize))
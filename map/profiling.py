@@ -0,0 +1,13 @@
+"""
+Timings of the stages of the map (see spiderwebs/profiling.py).
+"""
+
+import os
+import sys
+
+# The spiderwebs package is in the parent folder, after the modules of this folder
+_parent = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _parent not in sys.path:
+    sys.path.append(_parent)
+
+from spiderwebs.profiling import disable_profiling, enable_profiling, peak_rss, profile_report, stage
@@ -0,0 +1,214 @@
+import json
+import os
+import numpy as np
+
+
+class Scale:
+
+    '''
+
+    Scale that converts the values of one line of the spiderwebs to the range [0, 1].
+
+    Every scale is stored as an offset and a span, so applying it is
+    (value - offset) / span for each value.
+
+    Parameters
+    ----------
+    kind: {'minmax', 'zscore', 'robust', 'fixed'}
+        A string with the name of the method used to compute the scale.
+    offset: float
+        The value that is drawn in the center of the spiderweb.
+    span: float
+        The difference between the value drawn at the end of the line and the offset.
+    clip: bool
+        If True the values out of the scale are drawn in the center or at the end of the line.
+
+    '''
+
+    def __init__(self, kind, offset, span, clip=True):
+        self.kind = kind
+        self.offset = float(offset)
+        self.span = float(span)
+        self.clip = clip
+
+    def __call__(self, values):
+        values = np.asarray(values, dtype=float)
+        # A scale without range draws every value in the center
+        if self.span == 0:
+            return np.zeros_like(values)
+        x = (values - self.offset) / self.span
+        if self.clip:
+            x = np.clip(x, 0, 1)
+        return x
+
+    def __eq__(self, other):
+        return isinstance(other, Scale) and self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        return 'Scale(%r, offset=%r, span=%r, clip=%r)' % (self.kind, self.offset, self.span, self.clip)
+
+    def to_dict(self):
+        return {'kind': self.kind, 'offset': self.offset, 'span': self.span, 'clip': self.clip}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['kind'], data['offset'], data['span'], data.get('clip', True))
+
+
+def minmax_scale(values):
+    '''
+    Scale that draws the minimum value in the center and the maximum at the end of the line.
+    '''
+    values = np.asarray(values, dtype=float)
+    nmin = np.nanmin(values)
+    nmax = np.nanmax(values)
+    return Scale('minmax', nmin, nmax - nmin)
+
+
+def zscore_scale(values, deviations=3):
+    '''
+    Scale that draws the mean in the middle of the line and `deviations`
+    standard deviations at the center and at the end of the line.
+    '''
+    values = np.asarray(values, dtype=float)
+    mean = np.nanmean(values)
+    std = np.nanstd(values)
+    return Scale('zscore', mean - deviations*std, 2*deviations*std)
+
+
+def robust_scale(values, low=5, high=95):
+    '''
+    Scale that draws the `low` percentile in the center and the `high`
+    percentile at the end of the line, so outliers don't flatten the spiderwebs.
+    '''
+    values = np.asarray(values, dtype=float)
+    plow, phigh = np.nanpercentile(values, [low, high])
+    return Scale('robust', plow, phigh - plow)
+
+
+def fixed_scale(limit, lower=0):
+    '''
+    Scale that draws `lower` in the center and a fixed limit (for example
+    the regulatory limit of a pollutant) at the end of the line.
+    '''
+    return Scale('fixed', lower, limit - lower)
+
+
+METHODS = {
+    'minmax': minmax_scale,
+    'zscore': zscore_scale,
+    'robust': robust_scale,
+}
+
+
+def compute_scales(dataframe, columns, method='minmax', limits=None, **kwargs):
+
+    '''
+
+    Compute one scale for each column of a dataframe.
+
+    Parameters
+    ----------
+    dataframe: pandas.DataFrame
+        The dataframe with the complete dataset (for example all the records of filled.csv).
+    columns: list
+        A list with the name of the columns to scale.
+    method: {'minmax', 'zscore', 'robust', 'fixed'}
+        A string with the name of the method used to compute the scales.
+    limits: dict
+        A dict with the limit of each column. Only used with the method 'fixed'.
+    kwargs:
+        Extra parameters for the method (`deviations` for 'zscore', `low` and `high` for 'robust').
+
+    Returns
+    -------
+    dict
+        A dict with the scale of each column.
+
+    '''
+
+    if method == 'fixed':
+        if limits is None:
+            raise ValueError("The method 'fixed' needs the limit of each column.")
+        return {column: fixed_scale(limits[column]) for column in columns}
+    if method not in METHODS:
+        raise ValueError("Unknown value for 'method': %s" % method)
+    return {column: METHODS[method](dataframe[column].to_numpy(), **kwargs) for column in columns}
+
+
+def save_scales(scales, path, key=None):
+    '''
+    Save a dict of scales in a JSON file, with an optional key to validate it later.
+    '''
+    data = {'key': key, 'scales': {column: scale.to_dict() for column, scale in scales.items()}}
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    with open(path, 'w') as file:
+        json.dump(data, file)
+
+
+def load_scales(path, key=None):
+    '''
+    Load a dict of scales from a JSON file. Returns None if the file
+    doesn't exist or was saved with a different key.
+    '''
+    try:
+        with open(path, 'r') as file:
+            data = json.load(file)
+    except (OSError, ValueError):
+        return None
+    if data.get('key') != key:
+        return None
+    return {column: Scale.from_dict(scale) for column, scale in data['scales'].items()}
+
+
+class RunningScale:
+
+    '''
+
+    Statistics of one column updated with each new batch of values, for the
+    scales of records that keep arriving (see follow.py).
+
+    Only the count, mean, sum of the squared deviations, minimum and maximum
+    are kept, so the values are not stored. The batches are merged with the
+    parallel algorithm of Chan et al., which gives the same mean and
+    deviation as computing them over all the values at once.
+
+    '''
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min = np.inf
+        self.max = -np.inf
+
+    def update(self, values):
+        '''Add a batch of values. The NaNs are ignored.'''
+        values = np.asarray(values, dtype=float)
+        values = values[~np.isnan(values)]
+        if len(values) == 0:
+            return
+        count = len(values)
+        mean = values.mean()
+        m2 = ((values - mean)**2).sum()
+        delta = mean - self.mean
+        total = self.count + count
+        self.mean += delta * count / total
+        self.m2 += m2 + delta**2 * self.count * count / total
+        self.count = total
+        self.min = min(self.min, values.min())
+        self.max = max(self.max, values.max())
+
+    def scale(self, method='minmax', deviations=3):
+        '''
+        Return the Scale of the values added until now with the method
+        'minmax' or 'zscore' (the same of minmax_scale and zscore_scale).
+        '''
+        if method not in ('minmax', 'zscore'):
+            raise ValueError("The method %r can't be updated with each batch, use 'minmax', 'zscore' or 'fixed'." % method)
+        if self.count == 0:
+            return Scale(method, 0, 0)
+        if method == 'minmax':
+            return Scale('minmax', self.min, self.max - self.min)
+        std = np.sqrt(self.m2 / self.count)
+        return Scale('zscore', self.mean - deviations*std, 2*deviations*std)
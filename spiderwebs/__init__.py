@@ -0,0 +1,17 @@
+"""
+Radar charts (spiderwebs) of many datasets.
+
+One engine draws the spiderwebs (radar.py) and the outputs are built on it:
+
+- panels: all the spiderwebs in the panels of one figure (PDF, SVG, PNG or in memory).
+- images: one PNG image for each spiderweb, rendered in a pool of processes (batch.py).
+- animation: all the spiderwebs in one GIF or .mp4 video.
+
+Each output has its own create_spiderwebs, with the same first parameters.
+"""
+
+from .radar import RadarFigure, radar_factory, radar_figure, radar_projection, release_figures
+from .datasets import MAX_SPIDERWEBS, ColorError, DatasetError, SpiderwebError, normalize_datasets, validate_parameters
+from .batch import render_batch, render_icons, spiderweb_jobs
+from .writers import GifWriter, VideoWriter, open_writer
+from . import animation, images, panels
@@ -0,0 +1,82 @@
+"""
+Output of create_spiderwebs with all the spiderwebs in one animation (GIF or .mp4).
+"""
+
+import numpy as np
+from matplotlib.colors import to_rgba_array
+from .datasets import SpiderwebError, normalize_datasets, validate_parameters
+from .radar import RadarFigure, radar_figure
+from .writers import open_writer
+
+
+def spiderweb_colors(colors):
+    """
+    Return the RGB colors (0 to 255) of the lines and of the filling (over a
+    white background) of the spiderwebs, with the white background and the black text.
+    """
+    rgb = to_rgba_array(colors)[:, :3]
+    # The filling is drawn with alpha 0.25
+    return np.round(255*np.concatenate((rgb, 0.75 + 0.25*rgb, [[1, 1, 1], [0, 0, 0]]))).astype(np.uint8)
+
+
+def create_spiderwebs(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, outputtype, reusefigure=True, optimize=True):
+
+    """
+    Create a radar chart.
+
+    This function receives parameters and with that a radar chart is created.
+
+    Parameters
+    ----------
+    datasets: list, numpy.ndarray or pandas.DataFrame
+        A list that contains one list for each dataset, or a matrix (lines x spiderwebs).
+    lenlines: int
+        The length of the lines of the spiderweb.
+    numspiders: int
+        The number of spiderwebs to create.
+    title: String
+        The title of the figure.
+    titles: list
+        A list with the names of each spiderweb.
+    spoke_labels: list
+        A list with the names of each line of the spiderweb.
+    colors: list
+        A list with the color of each spiderweb, or one color for all of them.
+        Any matplotlib color is valid ('b', 'tab:red', '#ff8800', (1, 0, 0), ...).
+    typeframe: {'circle', 'polygon'}
+        A string with the name of the type of the Frame for the spiderwebs.
+    outputtype: {'gif', 'video'}
+        A string with the type of file to generate.
+    reusefigure: bool
+        If True all the spiderwebs are drawn in the same figure, updating only its data and title.
+    optimize: bool
+        If True the frames of the GIF share one palette with the colors of the
+        spiderwebs and only store what changed since the previous frame (see GifWriter).
+
+    Raises
+    ------
+    SpiderwebError
+        If a parameter is not valid (see validate_parameters).
+    """
+
+
+    # Validate the parameters recibed
+    if outputtype not in ('gif', 'video'):
+        raise SpiderwebError("The type of file must be 'gif' or 'video', not %r." % (outputtype,))
+    data, colors = validate_parameters(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe)
+
+    # Set the number of lines of each spiderweb
+    N = len(data)
+    # Normalize data
+    radii = normalize_datasets(data, lenlines)
+
+    # Each frame is rendered in memory and encoded before drawing the next one
+    with open_writer(title, outputtype, optimize, spiderweb_colors(colors)) as writer:
+        # Plot each case in the same figure or in a new figure
+        for i, titlespiderweb in enumerate(titles):
+            if reusefigure:
+                figure = radar_figure(N, typeframe)
+            else:
+                figure = RadarFigure(N, typeframe)
+            figure.draw(radii[i], titlespiderweb, colors[i], spoke_labels)
+            writer.append_data(figure.to_rgba())
@@ -0,0 +1,158 @@
+"""
+Rendering of many spiderwebs, each one in its own image, in a pool of processes.
+"""
+
+import numpy as np
+import matplotlib
+import os
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from .datasets import normalize_datasets
+from .profiling import stage
+from .radar import RadarFigure, radar_figure
+
+
+def spiderweb_jobs(datasets, lenlines, title, titles, spoke_labels, colors, typeframe, scales=None):
+
+    """
+    Normalize the datasets and return one job for each spiderweb to create.
+
+    The parameters are the same of create_spiderwebs. Each job is a tuple
+    (num_vars, typeframe, dataspider, titlespiderweb, color, spoke_labels, filename)
+    that can be sent to render_batch.
+    """
+
+    # Set the number of lines of each spiderweb
+    N = len(datasets)
+    # Normalize data
+    radii = normalize_datasets(datasets, lenlines, scales)
+    jobs = []
+    for i, titlespiderweb in enumerate(titles):
+        # Name of the image
+        filename = title + str(i+1) + '.png'
+        jobs.append((N, typeframe, radii[i], titlespiderweb, colors[i], spoke_labels, filename))
+    return jobs
+
+
+def _render_job(job, reusefigure=True):
+    """Draw the spiderweb of a job and save it in an image with .png format."""
+    N, typeframe, dataspider, titlespiderweb, color, spoke_labels, filename = job
+    with stage('figure'):
+        if reusefigure:
+            figure = radar_figure(N, typeframe)
+        else:
+            figure = RadarFigure(N, typeframe)
+        figure.draw(dataspider, titlespiderweb, color, spoke_labels)
+    # savefig returns when the image is written and closed
+    with stage('savefig'):
+        figure.savefig(filename, format='png', transparent=True)
+    return filename
+
+
+def _render_icon(job, size=(50, 50), reusefigure=True):
+    """Draw the spiderweb of a job and return it as an icon (see RadarFigure.to_icon)."""
+    N, typeframe, dataspider, titlespiderweb, color, spoke_labels, filename = job
+    with stage('figure'):
+        if reusefigure:
+            figure = radar_figure(N, typeframe)
+        else:
+            figure = RadarFigure(N, typeframe)
+        figure.draw(dataspider, titlespiderweb, color, spoke_labels)
+    with stage('savefig'):
+        return figure.to_icon(size)
+
+
+def _init_worker():
+    """Use the Agg backend in the processes of render_batch."""
+    matplotlib.use('Agg')
+
+
+def render_batch(jobs, workers=1, chunksize=None, reusefigure=True, manifest=None):
+
+    """
+    Render a batch of spiderwebs, splitting the jobs in a pool of processes.
+
+    Each process draws its jobs in its own cached RadarFigure.
+
+    Parameters
+    ----------
+    jobs: list
+        A list with the jobs returned by spiderweb_jobs (they can be of many hours).
+    workers: int
+        The number of processes to use. With None, one for each CPU. With 1 the jobs are rendered in this process.
+    chunksize: int
+        The number of jobs sent to a process at once. With None, the jobs are split in 4 chunks for each process.
+    reusefigure: bool
+        If True all the spiderwebs of a process are drawn in the same figure.
+    manifest: RenderManifest
+        If it is given, only the images that are missing or whose inputs
+        changed since they were saved are rendered (see map/manifest.py).
+
+    Returns
+    -------
+    list
+        A list with the names of the images, in the same order of the jobs.
+    """
+
+    filenames = [job[-1] for job in jobs]
+    if manifest is None:
+        return _map_jobs(partial(_render_job, reusefigure=reusefigure), jobs, workers, chunksize)
+    keys = [manifest.key(job, 'png') for job in jobs]
+    stale = manifest.stale_images(filenames, keys)
+    _map_jobs(partial(_render_job, reusefigure=reusefigure), [jobs[i] for i in stale], workers, chunksize)
+    manifest.record_images([filenames[i] for i in stale], [keys[i] for i in stale])
+    return filenames
+
+
+def render_icons(jobs, workers=1, chunksize=None, size=(50, 50), reusefigure=True, manifest=None):
+
+    """
+    Render a batch of spiderwebs directly as icons packed in one atlas.
+
+    The parameters are the same of render_batch, but no image is saved.
+
+    Parameters
+    ----------
+    size: tuple
+        The (width, height) of the icons.
+    manifest: RenderManifest
+        If it is given, the icons whose inputs didn't change since the last
+        run are copied from its atlas and only the rest are rendered.
+
+    Returns
+    -------
+    numpy.ndarray
+        The atlas (jobs x height x width x 4) with the RGBA icon of each job, in the same order of the jobs.
+    """
+
+    atlas = np.zeros((len(jobs), size[1], size[0], 4), dtype=np.uint8)
+    stale = list(range(len(jobs)))
+    if manifest is not None:
+        keys = [manifest.key(job, 'icon', tuple(size)) for job in jobs]
+        cached, rows = manifest.cached_icons()
+        stale = []
+        for i, key in enumerate(keys):
+            if key in rows and cached.shape[1:3] == atlas.shape[1:3]:
+                atlas[i] = cached[rows[key]]
+            else:
+                stale.append(i)
+    icons = _map_jobs(partial(_render_icon, size=size, reusefigure=reusefigure), [jobs[i] for i in stale], workers, chunksize)
+    for i, icon in zip(stale, icons):
+        atlas[i] = icon
+    if manifest is not None:
+        manifest.record_icons(atlas, keys)
+    return atlas
+
+
+def _map_jobs(render, jobs, workers, chunksize):
+    """Apply render to each job in this process or in a pool of processes (see render_batch)."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+    workers = min(workers, len(jobs))
+    # Render in this process
+    if workers <= 1:
+        return [render(job) for job in jobs]
+    if chunksize is None:
+        chunksize = max(1, len(jobs) // (workers*4))
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as executor:
+        return list(executor.map(render, jobs, chunksize=chunksize))
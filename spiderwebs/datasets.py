@@ -0,0 +1,154 @@
+"""
+Validation and normalization of the datasets of the spiderwebs.
+"""
+
+import numpy as np
+from matplotlib.colors import is_color_like, to_rgba_array
+from .profiling import stage
+
+
+# Maximum number of spiderwebs of create_spiderwebs in one call (except the pages of panels)
+MAX_SPIDERWEBS = 400
+
+
+def normalize_datasets(datasets, lenlines, scales=None):
+    """
+    Normalize the datasets to the length of the lines of the spiderweb.
+
+    All the datasets are converted to one matrix, so the minimum, maximum and
+    range of each line are calculated only once for every spiderweb.
+
+    Parameters
+    ----------
+    datasets: list, numpy.ndarray or pandas.DataFrame
+        A list that contains one list for each dataset, or a matrix (lines x spiderwebs).
+    lenlines: int
+        The length of the lines of the spiderweb.
+    scales: list
+        A list with one Scale (see scales.py) for each line of the spiderweb.
+        If it is None, each line is scaled with the minimum and maximum of the datasets.
+
+    Returns
+    -------
+    numpy.ndarray
+        A matrix (spiderwebs x lines) with the position of each point in the lines.
+        Lines where all the values are equal are drawn in the center of the spiderweb.
+    """
+    with stage('normalize'):
+        # One row for each line of the spiderweb and one column for each spiderweb
+        data = np.asarray(datasets, dtype=float)
+        # Use the precomputed scales of each line
+        if scales is not None:
+            x = np.stack([scale(row) for scale, row in zip(scales, data)])
+            return (lenlines*x).T
+        nmin = data.min(axis=1, keepdims=True)
+        nmax = data.max(axis=1, keepdims=True)
+        r = nmax - nmin
+        # Avoid the division by zero in the lines without range
+        x = np.divide(data - nmin, r, out=np.zeros_like(data), where=r != 0)
+        return (lenlines*x).T
+
+
+class SpiderwebError(ValueError):
+    """A parameter of create_spiderwebs is not valid."""
+
+
+class DatasetError(SpiderwebError):
+    """The datasets are not a numeric matrix (lines x spiderwebs) of finite values, or their shape doesn't match the other parameters."""
+
+
+class ColorError(SpiderwebError):
+    """A color is not a matplotlib color."""
+
+
+def as_datasets(datasets):
+    """
+    Return the datasets as a float matrix (lines x spiderwebs).
+
+    The datasets can be a list with one list for each line, a NumPy array or
+    a pandas DataFrame. Arrays of float are not copied.
+    """
+    try:
+        data = np.asarray(datasets)
+    except ValueError as error:
+        # Lists with different lengths
+        raise DatasetError('The datasets must be a matrix (lines x spiderwebs): %s' % error) from None
+    if data.ndim != 2:
+        raise DatasetError('The datasets must be a matrix (lines x spiderwebs), not an array of %d dimensions.' % data.ndim)
+    if data.dtype.kind not in 'biuf':
+        raise DatasetError('The datasets must be numbers, not %s.' % data.dtype)
+    data = data.astype(float, copy=False)
+    if not np.isfinite(data).all():
+        raise DatasetError('The datasets have NaN or infinite values.')
+    return data
+
+
+def as_colors(colors, numspiders):
+    """
+    Return a list with the color of each spiderweb.
+
+    The colors can be any matplotlib color: one (a string or a tuple) for all
+    the spiderwebs, or a list (or an array of RGB or RGBA rows) with one for
+    each spiderweb.
+    """
+    # One string or RGB(A) tuple for all the spiderwebs
+    if isinstance(colors, (str, tuple)) and is_color_like(colors):
+        return [colors]*numspiders
+    if isinstance(colors, np.ndarray):
+        colors = [tuple(color) for color in to_rgba_array(colors).tolist()]
+    if len(colors) != numspiders:
+        raise ColorError('There are %d colors for %d spiderwebs.' % (len(colors), numspiders))
+    try:
+        to_rgba_array(colors)
+    except (ValueError, TypeError):
+        invalid = [color for color in colors if not is_color_like(color)]
+        raise ColorError('Not valid colors: %s' % ', '.join(map(repr, invalid))) from None
+    return list(colors)
+
+
+def validate_parameters(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, scales=None, maxspiders=MAX_SPIDERWEBS):
+
+    """
+    Validate the parameters of create_spiderwebs.
+
+    The parameters are the same of create_spiderwebs. `maxspiders` is the
+    maximum number of spiderwebs, None for no limit.
+
+    Returns
+    -------
+    data: numpy.ndarray
+        The datasets as a float matrix (lines x spiderwebs), see as_datasets.
+    colors: list
+        The color of each spiderweb, see as_colors.
+
+    Raises
+    ------
+    DatasetError
+        If the datasets are not a numeric matrix of finite values with one row
+        for each spoke label and one column for each spiderweb.
+    ColorError
+        If a color is not a matplotlib color.
+    SpiderwebError
+        If another parameter is not valid.
+    """
+
+    data = as_datasets(datasets)
+    if isinstance(lenlines, bool) or not isinstance(lenlines, (int, np.integer)) or not 0 < lenlines <= 50:
+        raise SpiderwebError('The length of the lines must be an integer greater than 0 and up to 50, not %r.' % (lenlines,))
+    if isinstance(numspiders, bool) or not isinstance(numspiders, (int, np.integer)) or numspiders <= 0:
+        raise SpiderwebError('The number of spiderwebs must be an integer greater than 0, not %r.' % (numspiders,))
+    if maxspiders is not None and numspiders > maxspiders:
+        raise SpiderwebError('The number of spiderwebs must be up to %d, not %d.' % (maxspiders, numspiders))
+    if data.shape[1] != numspiders:
+        raise DatasetError('The datasets have %d spiderwebs (columns), not %d.' % (data.shape[1], numspiders))
+    if not isinstance(title, str):
+        raise SpiderwebError('The title of the figure must be a string.')
+    if len(titles) != numspiders:
+        raise SpiderwebError('There are %d names for %d spiderwebs.' % (len(titles), numspiders))
+    if len(spoke_labels) != data.shape[0]:
+        raise DatasetError('There are %d names for %d lines (rows of the datasets).' % (len(spoke_labels), data.shape[0]))
+    if scales is not None and len(scales) != data.shape[0]:
+        raise DatasetError('There are %d scales for %d lines (rows of the datasets).' % (len(scales), data.shape[0]))
+    if typeframe not in ('circle', 'polygon'):
+        raise SpiderwebError("The type of the frame must be 'circle' or 'polygon', not %r." % (typeframe,))
+    return data, as_colors(colors, numspiders)
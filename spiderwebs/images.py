@@ -0,0 +1,59 @@
+"""
+Output of create_spiderwebs with one PNG image for each spiderweb (used by the map).
+"""
+
+from .batch import render_batch, spiderweb_jobs
+from .datasets import validate_parameters
+
+
+def create_spiderwebs(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, scales=None, reusefigure=True, workers=1, chunksize=None):
+
+    """
+    Create a radar chart.
+
+    This function receives parameters and with that a radar chart is created.
+
+    Parameters
+    ----------
+    datasets: list, numpy.ndarray or pandas.DataFrame
+        A list that contains one list for each dataset, or a matrix (lines x spiderwebs).
+    lenlines: int
+        The length of the lines of the spiderweb.
+    numspiders: int
+        The number of spiderwebs to create.
+    title: String
+        The title of the figure.
+    titles: list
+        A list with the names of each spiderweb.
+    spoke_labels: list
+        A list with the names of each line of the spiderweb.
+    colors: list
+        A list with the color of each spiderweb, or one color for all of them.
+        Any matplotlib color is valid ('b', 'tab:red', '#ff8800', (1, 0, 0), ...).
+    typeframe: {'circle', 'polygon'}
+        A string with the name of the type of the Frame for the spiderwebs.
+    scales: list
+        A list with one Scale (see scales.py) for each line of the spiderweb.
+        If it is None, each line is scaled with the minimum and maximum of the datasets.
+    reusefigure: bool
+        If True all the spiderwebs are drawn in the same figure, updating only its data and title.
+    workers: int
+        The number of processes used to render the spiderwebs (see render_batch).
+    chunksize: int
+        The number of spiderwebs sent to a process at once (see render_batch).
+
+    Returns
+    -------
+    list
+        A list with the names of the images created.
+
+    Raises
+    ------
+    SpiderwebError
+        If a parameter is not valid (see validate_parameters).
+    """
+
+    # Validate the parameters recibed
+    data, colors = validate_parameters(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, scales)
+    jobs = spiderweb_jobs(data, lenlines, title, titles, spoke_labels, colors, typeframe, scales)
+    return render_batch(jobs, workers, chunksize, reusefigure)
@@ -0,0 +1,219 @@
+"""
+Output of create_spiderwebs with all the spiderwebs in the panels of one figure (PDF, SVG, PNG or in memory).
+"""
+
+import io
+import math
+import numpy as np
+import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.backends.backend_pdf import PdfPages
+from .datasets import SpiderwebError, normalize_datasets, validate_parameters
+from .radar import radar_projection
+
+
+# Formats of the figure of create_spiderwebs
+OUTPUT_TYPES = ('pdf', 'svg', 'png', 'rgba', 'bytes')
+
+# Size in inches of each spiderweb and maximum number of spiderwebs in a page of create_spiderwebs
+WEB_SIZE = 2.5
+MAX_PER_PAGE = 36
+
+
+def grid_layout(numspiders, maxperpage=MAX_PER_PAGE):
+    """
+    Return the number of rows and columns of a near-square grid for the
+    spiderwebs of one page, and the size in inches of the figure.
+
+    The figure is at least 8 x 8 inches and grows with the number of columns
+    and rows, so every spiderweb keeps about WEB_SIZE inches.
+    """
+    perpage = max(1, min(numspiders, maxperpage))
+    numcols = math.ceil(math.sqrt(perpage))
+    numrows = math.ceil(perpage / numcols)
+    figsize = (max(8, WEB_SIZE*numcols), max(8, WEB_SIZE*numrows + 1))
+    return numrows, numcols, figsize
+
+
+def save_figure(fig, title, outputtype='pdf', width=None):
+    """
+    Save a figure in a file or return its image.
+
+    Parameters
+    ----------
+    fig: matplotlib.figure.Figure
+        The figure.
+    title: String
+        The name of the file without extension.
+    outputtype: {'pdf', 'svg', 'png', 'rgba', 'bytes'}
+        'pdf' and 'svg' save a vector file, 'png' saves a raster image,
+        'rgba' returns the pixels and 'bytes' returns the PNG image in memory.
+    width: int
+        The width in pixels of the raster outputs. The height keeps the
+        proportion of the figure. By default the dpi of the figure is used.
+
+    Returns
+    -------
+    String, numpy.ndarray or bytes
+        The name of the file, the RGBA pixels (height x width x 4) or the PNG image.
+    """
+    if outputtype in ('pdf', 'svg'):
+        fig.savefig(title + '.' + outputtype, format=outputtype, transparent=True, dpi=1000)
+        return title + '.' + outputtype
+    dpi = fig.dpi if width is None else width / fig.get_figwidth()
+    if outputtype == 'png':
+        fig.savefig(title + '.png', format='png', transparent=True, dpi=dpi)
+        return title + '.png'
+    if outputtype == 'bytes':
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format='png', transparent=True, dpi=dpi)
+        return buffer.getvalue()
+    if outputtype == 'rgba':
+        # Draw in an Agg canvas at the dpi selected, keeping the canvas of pyplot
+        olddpi, oldcanvas = fig.dpi, fig.canvas
+        fig.set_dpi(dpi)
+        try:
+            canvas = FigureCanvasAgg(fig)
+            canvas.draw()
+            return np.array(canvas.buffer_rgba())
+        finally:
+            fig.set_dpi(olddpi)
+            fig.set_canvas(oldcanvas)
+    raise SpiderwebError("Unknown value for 'outputtype': %s" % outputtype)
+
+
+def create_spiderwebs(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, outputtype='pdf', width=None, show=True,
+                      maxperpage=MAX_PER_PAGE):
+
+    """
+    Create a radar chart.
+
+    This function receives parameters and with that a radar chart is created.
+
+    Parameters
+    ----------
+    datasets: list, numpy.ndarray or pandas.DataFrame
+        A list that contains one list for each dataset, or a matrix (lines x spiderwebs).
+    lenlines: int
+        The length of the lines of the spiderweb.
+    numspiders: int
+        The number of spiderwebs to create.
+    title: String
+        The title of the figure.
+    titles: list
+        A list with the names of each spiderweb.
+    spoke_labels: list
+        A list with the names of each line of the spiderweb.
+    colors: list
+        A list with the color of each spiderweb, or one color for all of them.
+        Any matplotlib color is valid ('b', 'tab:red', '#ff8800', (1, 0, 0), ...).
+    typeframe: {'circle', 'polygon'}
+        A string with the name of the type of the Frame for the spiderwebs.
+    outputtype: {'pdf', 'svg', 'png', 'rgba', 'bytes'}
+        The format of the figure (see save_figure).
+    width: int
+        The width in pixels of the 'png', 'rgba' and 'bytes' outputs.
+    show: bool
+        If True the figure is shown with pyplot, which blocks until it is
+        closed. With more than one page only the last page is shown, the
+        rest are closed after being saved. Otherwise it is drawn without
+        pyplot, so no display is needed.
+    maxperpage: int
+        The maximum number of spiderwebs in a figure. More spiderwebs are
+        split in pages, which are rendered and saved one at a time: all the
+        pages of 'pdf' in one file, the pages of the other formats in
+        title_1, title_2, ...
+
+    Returns
+    -------
+    String, numpy.ndarray, bytes or list
+        The output of save_figure. With more than one page, a list with the
+        output of each page, except for 'pdf' (the name of the file).
+
+    Raises
+    ------
+    SpiderwebError
+        If a parameter is not valid (see validate_parameters).
+    """
+
+
+    # Validate the parameters recibed, the pages have no limit of spiderwebs
+    if outputtype not in OUTPUT_TYPES:
+        raise SpiderwebError("Unknown value for 'outputtype': %s" % outputtype)
+    if isinstance(maxperpage, bool) or not isinstance(maxperpage, (int, np.integer)) or maxperpage <= 0:
+        raise SpiderwebError('The maximum number of spiderwebs in a page must be an integer greater than 0, not %r.' % (maxperpage,))
+    data, colors = validate_parameters(datasets, lenlines, numspiders, title, titles, spoke_labels, colors, typeframe, maxspiders=None)
+
+    # Set the number of lines of each spiderweb
+    N = len(data)
+    projection, theta = radar_projection(N, typeframe)
+    # Normalize data
+    radii = normalize_datasets(data, lenlines)
+    # Set the number of columns and rows and the pages
+    numrows, numcols, figsize = grid_layout(numspiders, maxperpage)
+    perpage = min(numspiders, maxperpage)
+    numpages = math.ceil(numspiders / perpage)
+    newn = 0.5
+    rgrids = []
+    for z in range(lenlines*2):
+        rgrids.append(newn)
+        newn = newn + 0.5
+
+    # All the pages of the PDF are written in the same file
+    pdf = PdfPages(title + '.pdf') if outputtype == 'pdf' and numpages > 1 else None
+    outputs = []
+    try:
+        for page in range(numpages):
+            first = page*perpage
+            last = min(first + perpage, numspiders)
+            # Draw the shape of the spiderwebs
+            if show:
+                fig = plt.figure(figsize=figsize)
+            else:
+                # The figure is not managed by pyplot, so it is never shown or kept open
+                fig = Figure(figsize=figsize)
+                FigureCanvasAgg(fig)
+            # The same margins in inches of a figure of 8 x 8 inches
+            fig.subplots_adjust(wspace=0.5, hspace=0.20, top=1 - 1.2/figsize[1], bottom=0.4/figsize[1])
+
+            # Plot each case on separate axes
+            for i in range(first, last):
+                ax = fig.add_subplot(numrows, numcols, i - first + 1, projection=projection)
+                # Put labels in the lines
+                ax.set_rgrids(rgrids)
+                ax.set_title(titles[i], weight='bold', size='medium', position=(0.5, 1.1), horizontalalignment='center', verticalalignment='center')
+                dataspider = radii[i]
+                # Draw the new lines in the spiderweb
+                ax.plot(theta, dataspider, color=colors[i])
+                ax.fill(theta, dataspider, facecolor=colors[i], alpha=0.25)
+                # Put the name of each line in the figure
+                ax.set_varlabels(spoke_labels)
+
+            # Put the name of the figure
+            figtitle = title if numpages == 1 else '%s (%d/%d)' % (title, page + 1, numpages)
+            fig.text(0.5, 1 - 0.28/figsize[1], figtitle, horizontalalignment='center', color='black', weight='bold', size='large')
+
+            # Save the page in the format selected
+            if pdf is not None:
+                pdf.savefig(fig, transparent=True, dpi=1000)
+            elif numpages == 1:
+                outputs.append(save_figure(fig, title, outputtype, width))
+            else:
+                outputs.append(save_figure(fig, title + '_' + str(page + 1), outputtype, width))
+            if not show:
+                # Free the page before drawing the next one
+                fig.clear()
+            elif page < numpages - 1:
+                # The page is already saved, only the last one is kept open to be shown
+                plt.close(fig)
+    finally:
+        if pdf is not None:
+            pdf.close()
+
+    # Show the figures
+    if show:
+        plt.show()
+    if pdf is not None:
+        return title + '.pdf'
+    return outputs[0] if numpages == 1 else outputs
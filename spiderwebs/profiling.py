@@ -0,0 +1,84 @@
+"""
+Timings of the stages of the map, recorded only when profiling is enabled.
+"""
+
+from contextlib import contextmanager
+import sys
+import time
+
+
+# Seconds and calls of each stage, None while profiling is disabled
+_timings = None
+
+
+def enable_profiling() -> None:
+    """
+    Start recording the stages from zero.
+    """
+    global _timings
+    _timings = {}
+
+
+def disable_profiling() -> None:
+    global _timings
+    _timings = None
+
+
+@contextmanager
+def stage(name: str):
+
+    """
+
+    Add the time spent in the block to the stage `name`.
+
+    Stages can be nested (for example 'render' contains 'figure' and
+    'savefig'), so the times of different stages are not added. The stages run
+    in the processes of a pool of workers are not recorded.
+
+    """
+
+    if _timings is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timing = _timings.setdefault(name, [0.0, 0])
+        timing[0] += time.perf_counter() - start
+        timing[1] += 1
+
+
+def peak_rss() -> dict:
+
+    """
+
+    Return the peak memory (resident set size) in bytes of this process and of its finished child processes.
+
+    """
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is in bytes in macOS and in kilobytes in Linux
+    unit = 1 if sys.platform == 'darwin' else 1024
+    return {
+        'self': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit,
+        'children': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit,
+    }
+
+
+def profile_report() -> dict:
+
+    """
+
+    Return the stages recorded since enable_profiling, sorted from the slowest, and the peak memory.
+
+    """
+
+    stages = sorted((_timings or {}).items(), key=lambda item: -item[1][0])
+    return {
+        'stages': {name: {'seconds': round(seconds, 6), 'calls': calls} for name, (seconds, calls) in stages},
+        'peak_rss_bytes': peak_rss(),
+    }
@@ -0,0 +1,238 @@
+"""
+The radar charts (spiderwebs) drawn by every output of the package.
+"""
+
+import numpy as np
+from matplotlib.patches import Circle, RegularPolygon
+from matplotlib.path import Path
+from matplotlib.projections.polar import PolarAxes
+from matplotlib.projections import register_projection
+from matplotlib.spines import Spine
+from matplotlib.transforms import Affine2D
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from PIL import Image
+
+# Projections already created by radar_projection, one for each (num_vars, frame)
+_radar_projections = {}
+
+# unit_regular_polygon gives a polygon of radius 1 centered at (0, 0) but we
+# want a polygon of radius 0.5 centered at (0.5, 0.5) in axes coordinates.
+_POLYGON_TRANSFORM = Affine2D().scale(.5).translate(.5, .5).frozen()
+
+
+def _create_radar_axes(num_vars, frame, name, theta):
+    """Create the RadarAxes class for `num_vars` axes and a `frame`."""
+    if frame not in ('circle', 'polygon'):
+        raise ValueError("Unknown value for 'frame': %s" % frame)
+    theta_degrees = np.degrees(theta)
+    spine_path = Path.unit_regular_polygon(num_vars)
+
+    class RadarAxes(PolarAxes):
+
+        # Use 1 line segment to connect specified points
+        RESOLUTION = 1
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # Rotate plot such that the first axis is at the top
+            self.set_theta_zero_location('N')
+
+        def fill(self, *args, closed=True, **kwargs):
+            """Override fill so that line is closed by default"""
+            return super().fill(closed=closed, *args, **kwargs)
+
+        def plot(self, *args, **kwargs):
+            """Override plot so that line is closed by default"""
+            lines = super().plot(*args, **kwargs)
+            for line in lines:
+                self._close_line(line)
+
+        def _close_line(self, line):
+            x, y = line.get_data()
+            # FIXME: markers at x[0], y[0] get doubled-up
+            if x[0] != x[-1]:
+                x = np.append(x, x[0])
+                y = np.append(y, y[0])
+                line.set_data(x, y)
+
+        def set_varlabels(self, labels):
+            self.set_thetagrids(theta_degrees, labels)
+
+        def _gen_axes_patch(self):
+            # The Axes patch must be centered at (0.5, 0.5) and of radius 0.5 in axes coordinates.
+            if frame == 'circle':
+                return Circle((0.5, 0.5), 0.5)
+            return RegularPolygon((0.5, 0.5), num_vars,
+                                  radius=.5, edgecolor="k")
+
+        def _gen_axes_spines(self):
+            if frame == 'circle':
+                return super()._gen_axes_spines()
+            # spine_type must be 'left'/'right'/'top'/'bottom'/'circle'.
+            spine = Spine(axes=self,
+                          spine_type='circle',
+                          path=spine_path)
+            spine.set_transform(_POLYGON_TRANSFORM + self.transAxes)
+            return {'polar': spine}
+
+    RadarAxes.name = name
+    return RadarAxes
+
+
+def radar_projection(num_vars, frame='circle'):
+    """
+    Return the name of a registered radar projection with `num_vars` axes.
+
+    The RadarAxes class is created and registered only once for each
+    (`num_vars`, `frame`), so calling it for every chart is cheap.
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of variables for radar chart.
+    frame : {'circle', 'polygon'}
+        Shape of frame surrounding axes.
+
+    Returns
+    -------
+    name : str
+        The name of the projection to use in `subplot_kw`.
+    theta : numpy.ndarray
+        The angles of the axes (read only).
+    """
+    key = (num_vars, frame)
+    if key not in _radar_projections:
+        # Calculate evenly-spaced axis angles
+        theta = np.linspace(0, 2*np.pi, num_vars, endpoint=False)
+        theta.flags.writeable = False
+        name = 'radar_%d_%s' % key
+        radar_axes = _create_radar_axes(num_vars, frame, name, theta)
+        register_projection(radar_axes)
+        # Subclass registered as 'radar' by radar_factory
+        alias = type('RadarAxes', (radar_axes,), {'name': 'radar'})
+        _radar_projections[key] = (name, theta, alias)
+    return _radar_projections[key][:2]
+
+
+def radar_factory(num_vars, frame='circle'):
+    """
+    Create a radar chart with `num_vars` axes.
+
+    This function registers the cached RadarAxes projection of
+    `radar_projection` with the name 'radar'.
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of variables for radar chart.
+    frame : {'circle', 'polygon'}
+        Shape of frame surrounding axes.
+
+    """
+    name, theta = radar_projection(num_vars, frame)
+    register_projection(_radar_projections[(num_vars, frame)][2])
+    return theta
+
+
+# Figures already created by radar_figure, one for each (num_vars, frame)
+_radar_figures = {}
+
+
+class RadarFigure:
+
+    """
+    Figure with one spiderweb that can be reused to draw many spiderwebs.
+
+    The axes, the line and the polygon are created once. Drawing a new
+    spiderweb only updates their data, the colors and the title.
+
+    Parameters
+    ----------
+    num_vars : int
+        Number of variables for radar chart.
+    frame : {'circle', 'polygon'}
+        Shape of frame surrounding axes.
+    """
+
+    def __init__(self, num_vars, frame='circle'):
+        projection, self.theta = radar_projection(num_vars, frame)
+        # The figure is not managed by pyplot, so it is never shown or kept open
+        self.figure = Figure(figsize=(8, 8))
+        FigureCanvasAgg(self.figure)
+        self.figure.subplots_adjust(wspace=0.5, hspace=0.20, top=0.85, bottom=0.05)
+        self.ax = self.figure.add_subplot(projection=projection)
+        self.title = self.ax.set_title('', weight='bold', size='medium', position=(0.5, 1.1), horizontalalignment='center', verticalalignment='center')
+        empty = np.zeros(num_vars)
+        self.ax.plot(self.theta, empty)
+        self.line = self.ax.lines[-1]
+        self.polygon = self.ax.fill(self.theta, empty, alpha=0.25)[0]
+        self.spoke_labels = None
+
+    def draw(self, dataspider, title, color, spoke_labels):
+        """Update the figure with the data, the title and the color of a new spiderweb."""
+        self.title.set_text(title)
+        # Close the line in the first point
+        self.line.set_data(np.append(self.theta, self.theta[0]), np.append(dataspider, dataspider[0]))
+        self.line.set_color(color)
+        self.polygon.set_xy(np.column_stack((self.theta, dataspider)))
+        self.polygon.set_facecolor(color)
+        # Scale the lines to the new data
+        self.ax.relim()
+        self.ax.autoscale_view()
+        # Put the name of each line in the figure. As a list, so the labels
+        # can be any sequence (the index of a DataFrame, an array...)
+        spoke_labels = list(spoke_labels)
+        if spoke_labels != self.spoke_labels:
+            self.ax.set_varlabels(spoke_labels)
+            self.spoke_labels = spoke_labels
+        return self
+
+    def savefig(self, *args, **kwargs):
+        self.figure.savefig(*args, **kwargs)
+
+    def to_rgba(self):
+        """Render the figure with the Agg canvas and return its RGBA buffer (height x width x 4)."""
+        self.figure.canvas.draw()
+        return np.asarray(self.figure.canvas.buffer_rgba())
+
+    def to_icon(self, size=(50, 50), supersample=2):
+        """
+        Render the figure directly at a thumbnail size and return its transparent
+        RGBA pixels (height x width x 4). It is rendered at `supersample` times
+        the size and reduced, to smooth the lines.
+        """
+        width, height = size
+        dpi = self.figure.dpi
+        # The figure is square, so one dpi gives the width and the height
+        self.figure.set_dpi(width*supersample / self.figure.get_figwidth())
+        # Transparent background, as the images saved with transparent=True
+        patches = [self.figure.patch, self.ax.patch]
+        alphas = [patch.get_alpha() for patch in patches]
+        for patch in patches:
+            patch.set_alpha(0)
+        try:
+            self.figure.canvas.draw()
+            image = Image.fromarray(np.asarray(self.figure.canvas.buffer_rgba()))
+        finally:
+            self.figure.set_dpi(dpi)
+            for patch, alpha in zip(patches, alphas):
+                patch.set_alpha(alpha)
+        return np.asarray(image.resize((width, height), Image.LANCZOS))
+
+
+def radar_figure(num_vars, frame='circle'):
+    """
+    Return the cached RadarFigure for `num_vars` axes and a `frame`.
+    """
+    key = (num_vars, frame)
+    if key not in _radar_figures:
+        _radar_figures[key] = RadarFigure(num_vars, frame)
+    return _radar_figures[key]
+
+
+def release_figures():
+    """
+    Close the figures cached by radar_figure.
+    """
+    _radar_figures.clear()
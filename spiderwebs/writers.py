@@ -0,0 +1,216 @@
+"""
+Writers of the animations (GIF and .mp4) that encode each frame when it is received.
+"""
+
+import os
+import numpy as np
+import cv2
+from PIL import Image, GifImagePlugin
+from .profiling import stage
+
+
+class VideoWriter:
+
+    """
+    Writer of .mp4 videos with the same interface of the imageio writers.
+
+    The video is opened with the size of the first frame received.
+
+    Parameters
+    ----------
+    filename: String
+        The name of the video.
+    fps: int
+        The number of frames for each second.
+    """
+
+    def __init__(self, filename, fps=1):
+        self.filename = filename
+        self.fps = fps
+        self.writer = None
+
+    def append_data(self, image):
+        """Encode a RGB or RGBA frame in the video."""
+        if self.writer is None:
+            height, width = image.shape[:2]
+            self.writer = cv2.VideoWriter(self.filename, cv2.VideoWriter_fourcc(*'mp4v'), self.fps, (width, height))
+        with stage('encode'):
+            code = cv2.COLOR_RGBA2BGR if image.shape[2] == 4 else cv2.COLOR_RGB2BGR
+            self.writer.write(cv2.cvtColor(image, code))
+
+    def flush(self):
+        """Nothing to do: the .mp4 is only complete when it is closed."""
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class GifWriter:
+
+    """
+    Writer of GIFs that encodes each frame in the file when it is received.
+
+    Each frame is quantized with its own palette, so the frames are never
+    kept in memory until the GIF is closed, and the encoded frames are
+    independent and can be reused in other GIFs of the same size.
+
+    With optimize=True all the frames share one global palette (the palette
+    of the first frame and `colors`) and each frame only stores the box of
+    the pixels that changed since the previous frame. The pixels of the box
+    that didn't change are transparent, so they compress to almost nothing.
+    This makes the GIF several times smaller and faster to write when the
+    frames differ in small regions, like the icons of the map.
+
+    The file is created with the first frame, so a GIF without frames (which
+    can't be read) is never written.
+
+    Parameters
+    ----------
+    filename: String
+        The name of the GIF.
+    size: tuple
+        The (width, height) of the frames. By default the size of the first frame.
+    duration: float
+        The number of seconds that each frame is shown.
+    optimize: bool
+        If True the frames are encoded with a global palette and only the changes.
+    colors: numpy.ndarray
+        The colors (RGB rows from 0 to 255) that are added to the global
+        palette, for the colors that are not in the first frame.
+    """
+
+    # Index of the global palette used for the pixels that didn't change
+    TRANSPARENT = 255
+
+    def __init__(self, filename, size=None, duration=1, optimize=False, colors=None):
+        self.filename = filename
+        self.size = size
+        self.file = None
+        self.duration = int(duration*1000)
+        self.optimize = optimize
+        self.colors = np.zeros((0, 3), dtype=np.uint8) if colors is None else np.unique(np.asarray(colors, dtype=np.uint8), axis=0)
+        self.started = False
+        self.palette = None
+        self.previous = None
+
+    def _palette(self, image):
+        """Return the global palette: the extra colors, the colors of the image and the transparent index."""
+        extra = self.colors[:self.TRANSPARENT//2]
+        quantized = image.quantize(self.TRANSPARENT - len(extra))
+        colors = np.asarray(quantized.getpalette()[:3*(self.TRANSPARENT - len(extra))], dtype=np.uint8).reshape(-1, 3)
+        # The lookup of PIL is not exact, so the colors of the image close to an
+        # extra color are dropped and the extra color is the only candidate
+        distances = np.abs(colors[:, None, :].astype(int) - extra[None, :, :].astype(int)).max(axis=2)
+        if len(extra):
+            colors = colors[distances.min(axis=1) > 8]
+        # Without the transparent index, so no pixel is quantized to it
+        colors = np.concatenate((extra, colors))
+        palette = Image.new('P', (1, 1))
+        palette.putpalette(colors.ravel().tobytes())
+        return palette
+
+    def _write_header(self, size, palette=None):
+        # The header has the size of the frames (the logical screen) and, in
+        # optimize mode, the global palette. Otherwise every frame has its own palette
+        self.file = open(self.filename, 'wb')
+        screen = Image.new('P', size)
+        if palette is not None:
+            screen.putpalette(palette.getpalette())
+        header, used = GifImagePlugin.getheader(screen, info={'loop': 0})
+        for data in header:
+            self.file.write(data)
+        self.started = True
+
+    def encode(self, image):
+        """Return the bytes of a RGB or RGBA frame encoded for the GIF, with its own palette."""
+        with stage('encode'):
+            frame = Image.fromarray(np.ascontiguousarray(image[:, :, :3])).quantize(256)
+            return b''.join(GifImagePlugin.getdata(frame, duration=self.duration, include_color_table=True))
+
+    def encode_changes(self, image):
+        """
+        Return the bytes of a RGB or RGBA frame encoded with the global
+        palette, only with the box that changed since the last frame.
+        """
+        with stage('encode'):
+            rgb = Image.fromarray(np.ascontiguousarray(image[:, :, :3]))
+            if self.palette is None:
+                self.palette = self._palette(rgb)
+            indices = np.asarray(rgb.quantize(palette=self.palette, dither=Image.Dither.NONE))
+            offset = (0, 0)
+            params = {'duration': self.duration, 'disposal': 1}
+            if self.previous is None:
+                box = indices
+            else:
+                changed = indices != self.previous
+                rows = np.flatnonzero(changed.any(axis=1))
+                cols = np.flatnonzero(changed.any(axis=0))
+                if len(rows) == 0:
+                    # The same frame, only one transparent pixel
+                    rows = cols = np.zeros(1, dtype=int)
+                y0, y1, x0, x1 = rows[0], rows[-1] + 1, cols[0], cols[-1] + 1
+                box = np.where(changed[y0:y1, x0:x1], indices[y0:y1, x0:x1], self.TRANSPARENT).astype(np.uint8)
+                offset = (int(x0), int(y0))
+                params['transparency'] = self.TRANSPARENT
+            self.previous = indices
+            frame = Image.fromarray(box, 'P')
+            frame.putpalette(self.palette.getpalette())
+            return b''.join(GifImagePlugin.getdata(frame, offset, **params))
+
+    def append_data(self, image):
+        """Encode a RGB or RGBA frame in the GIF."""
+        if self.optimize:
+            data = self.encode_changes(image)
+            if not self.started:
+                self._write_header(self.size or (image.shape[1], image.shape[0]), self.palette)
+            self.file.write(data)
+            return
+        if not self.started:
+            self._write_header(self.size or (image.shape[1], image.shape[0]))
+        self.file.write(self.encode(image))
+
+    def append_encoded(self, data):
+        """Add a frame already encoded with encode. The writer needs `size` if it is the first frame."""
+        if not self.started:
+            self._write_header(self.size)
+        self.file.write(data)
+
+    def flush(self):
+        """
+        Write the trailer after the frames received until now, so the GIF
+        can be read while it is still open. The next frame overwrites it.
+        """
+        if self.started and not self.file.closed:
+            self.file.write(b';')
+            self.file.flush()
+            self.file.seek(-1, os.SEEK_CUR)
+
+    def close(self):
+        # Without frames the file was never created
+        if self.file is not None and not self.file.closed:
+            # GIF trailer
+            self.file.write(b';')
+            self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+def open_writer(title, outputtype, optimize=False, colors=None):
+    """
+    Open the writer of a GIF (title.gif) or a .mp4 video (title.mp4) that receives RGB or RGBA frames.
+    `optimize` and `colors` are used by the GIF (see GifWriter).
+    """
+    if outputtype == 'gif':
+        return GifWriter(title + '.gif', duration=1, optimize=optimize, colors=colors)
+    return VideoWriter(title + '.mp4', 1)